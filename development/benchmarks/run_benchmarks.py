@@ -0,0 +1,298 @@
+"""Benchmark the solution, simulation, likelihood and MSM of respy stage by stage.
+
+Each example model in :data:`respy.config.EXAMPLE_MODELS` is benchmarked with and
+without interpolation and with and without ambiguity. For each configuration, the
+factories and criterion functions are called repeatedly and the duration of every
+stage, e.g., the state space creation, the backward induction per period or the
+conditional draws, is recorded with :class:`~benchmarks.stage_timer.StageTimer`.
+
+Run all benchmarks from the ``development`` directory with
+
+.. code-block:: bash
+
+    $ python -m benchmarks.run_benchmarks run
+
+and find the results in ``benchmark_results.json``. Compare the results of two commits
+with
+
+.. code-block:: bash
+
+    $ python -m benchmarks.run_benchmarks compare baseline.json benchmark_results.json
+
+"""
+import contextlib
+import datetime as dt
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import click
+import numba as nb
+from benchmarks.stage_timer import StageTimer
+
+import respy as rp
+import respy.likelihood
+import respy.simulate
+import respy.solve
+from respy.config import EXAMPLE_MODELS
+from respy.method_of_simulated_moments import get_diag_weighting_matrix
+
+CONTEXT_SETTINGS = {"help_option_names": ["-h", "--help"]}
+
+ETAS = [0, 0.1]
+INTERPOLATION_POINTS = 200
+N_REPETITIONS = 3
+
+STAGES = [
+    (respy.solve, "create_state_space_class", "state_space", False),
+    (respy.solve, "_create_choice_rewards", "create_choice_rewards", False),
+    (respy.solve, "_full_solution", "backward_induction", True),
+    (respy.solve, "interpolate", "backward_induction", True),
+    (respy.likelihood, "_process_estimation_data", "process_estimation_data", False),
+    (respy.likelihood, "update_means_and_log_prob_wages", "wage_likelihood", False),
+    (
+        respy.likelihood,
+        "_simulate_log_probability_of_individuals_observed_choice",
+        "choice_probabilities",
+        False,
+    ),
+    (respy.simulate, "_simulate_agents", "simulate_agents", False),
+]
+"""list: Functions in respy's modules which are timed as stages.
+
+Each entry contains the module, the name of the function, the name of the stage and an
+indicator for whether the stage is executed once per period.
+
+"""
+
+
+def run_benchmarks(models, n_repetitions, output):
+    """Run the benchmarks and save the results.
+
+    Parameters
+    ----------
+    models : list
+        Names of example models.
+    n_repetitions : int
+        Number of repetitions of each benchmark.
+    output : pathlib.Path
+        Path to the JSON file with the results.
+
+    """
+    results = {"metadata": _collect_metadata(n_repetitions), "benchmarks": []}
+
+    configurations = itertools.product(models, [False, True], ETAS)
+    for model, interpolation, eta in configurations:
+        click.echo(f"Benchmark {model} with interpolation={interpolation}, eta={eta}.")
+        result = run_single_benchmark(model, interpolation, eta, n_repetitions)
+        results["benchmarks"].append(result)
+
+        # Save intermediate results such that long runs can be inspected.
+        output.write_text(json.dumps(results, indent=4))
+
+    click.secho(f"Results are saved in {output}.", fg="green")
+
+
+def run_single_benchmark(model, interpolation, eta, n_repetitions):
+    """Benchmark a single configuration of a model.
+
+    The first repetition is not recorded because it includes the compilation of the
+    Numba functions.
+
+    """
+    params, options = rp.get_example_model(model, with_data=False)
+    options["interpolation_points"] = INTERPOLATION_POINTS if interpolation else -1
+    params.loc[("eta", "eta"), "value"] = eta
+
+    simulate = rp.get_simulate_func(params, options)
+    df = simulate(params)
+
+    calc_moments = [_calc_choice_frequencies, _calc_wage_mean]
+    empirical_moments = [_replace_nans(func(df)) for func in calc_moments]
+    weighting_matrix = get_diag_weighting_matrix(empirical_moments)
+
+    timer = StageTimer()
+    calc_moments = [timer.wrap(func, "moments") for func in calc_moments]
+    periods = list(range(options["n_periods"]))
+
+    with _patch_stages(timer):
+        for repetition in range(n_repetitions + 1):
+            if repetition == 1:
+                timer.reset()
+
+            with timer.measure("solve"):
+                solve = rp.get_solve_func(params, options)
+                timer.start_periods("backward_induction", reversed(periods))
+                solve(params)
+
+            with timer.measure("simulate"):
+                simulate = rp.get_simulate_func(params, options)
+                timer.start_periods("backward_induction", reversed(periods))
+                simulate(params)
+
+            with timer.measure("likelihood"):
+                crit_func = rp.get_crit_func(params, options, df)
+                timer.start_periods("backward_induction", reversed(periods))
+                crit_func(params)
+
+            with timer.measure("msm"):
+                msm = rp.get_msm_func(
+                    params,
+                    options,
+                    calc_moments,
+                    _replace_nans,
+                    empirical_moments,
+                    weighting_matrix,
+                )
+                timer.start_periods("backward_induction", reversed(periods))
+                msm(params)
+
+    return {
+        "model": model,
+        "interpolation": interpolation,
+        "interpolation_points": options["interpolation_points"],
+        "eta": eta,
+        "n_periods": options["n_periods"],
+        "stages": timer.summarize(n_repetitions),
+    }
+
+
+def compare_benchmarks(baseline, new, threshold):
+    """Compare two benchmark results and report stages which became slower.
+
+    Parameters
+    ----------
+    baseline : pathlib.Path
+        Path to the JSON file with the results of the baseline.
+    new : pathlib.Path
+        Path to the JSON file with the new results.
+    threshold : float
+        Relative increase of the duration of a stage which is reported as a regression.
+
+    Returns
+    -------
+    regressions : list
+        List of tuples with the configuration, the stage and the durations of the
+        baseline and the new results.
+
+    """
+    baseline = {
+        _get_configuration(result): result["stages"]
+        for result in json.loads(baseline.read_text())["benchmarks"]
+    }
+    new = {
+        _get_configuration(result): result["stages"]
+        for result in json.loads(new.read_text())["benchmarks"]
+    }
+
+    regressions = []
+    for configuration in baseline.keys() & new.keys():
+        for stage in baseline[configuration].keys() & new[configuration].keys():
+            duration_baseline = baseline[configuration][stage]["duration"]
+            duration_new = new[configuration][stage]["duration"]
+            if duration_new > duration_baseline * (1 + threshold):
+                regressions.append(
+                    (configuration, stage, duration_baseline, duration_new)
+                )
+
+    return sorted(regressions)
+
+
+def _get_configuration(result):
+    return result["model"], result["interpolation"], result["eta"]
+
+
+@contextlib.contextmanager
+def _patch_stages(timer):
+    with contextlib.ExitStack() as stack:
+        for module, name, stage, per_period in STAGES:
+            stack.enter_context(timer.patch(module, name, stage, per_period))
+        yield
+
+
+def _collect_metadata(n_repetitions):
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent
+        )
+        commit = commit.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "respy_version": rp.__version__,
+        "date": str(dt.datetime.now()),
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "python_version": platform.python_version(),
+        "n_cpus": os.cpu_count(),
+        "numba_num_threads": nb.config.NUMBA_NUM_THREADS,
+        "n_repetitions": n_repetitions,
+    }
+
+
+def _calc_choice_frequencies(df):
+    return df.groupby("Period").Choice.value_counts(normalize=True).unstack()
+
+
+def _calc_wage_mean(df):
+    return df.groupby("Period")["Wage"].mean()
+
+
+def _replace_nans(df):
+    return df.fillna(0)
+
+
+@click.group(context_settings=CONTEXT_SETTINGS)
+def cli():
+    """CLI manager for benchmarks."""
+    pass
+
+
+@cli.command()
+@click.option(
+    "--model",
+    "models",
+    multiple=True,
+    type=click.Choice(EXAMPLE_MODELS),
+    help="Benchmark only this model. Can be passed multiple times.",
+)
+@click.option("--n-repetitions", default=N_REPETITIONS, help="Repetitions per stage.")
+@click.option(
+    "--output", default="benchmark_results.json", type=Path, help="Output file."
+)
+def run(models, n_repetitions, output):
+    """Run the benchmarks for all or some example models."""
+    models = list(models) if models else list(EXAMPLE_MODELS)
+    run_benchmarks(models, n_repetitions, output)
+
+
+@cli.command()
+@click.argument("baseline", type=Path)
+@click.argument("new", type=Path)
+@click.option("--threshold", default=0.1, help="Tolerated relative slowdown.")
+def compare(baseline, new, threshold):
+    """Compare the results of two benchmarks."""
+    regressions = compare_benchmarks(baseline, new, threshold)
+
+    for configuration, stage, duration_baseline, duration_new in regressions:
+        click.secho(
+            f"{configuration} {stage}: {duration_baseline:.4f}s -> "
+            f"{duration_new:.4f}s",
+            fg="red",
+        )
+
+    if regressions:
+        sys.exit(1)
+    else:
+        click.secho("No regressions.", fg="green")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,126 @@
+"""Measure the runtime of single stages of respy.
+
+The stages are measured by temporarily replacing functions in the namespaces of respy's
+modules with wrappers which record the duration of each call. The functions are looked
+up in the module namespace at call time, so the wrappers do not need any changes to
+respy itself.
+
+"""
+import contextlib
+import functools
+import time
+from collections import defaultdict
+
+
+class StageTimer:
+    """Collect the durations of stages.
+
+    Stages can be nested with :meth:`measure`. The name of a stage is prefixed with the
+    names of all enclosing stages, e.g., ``"likelihood/choice_probabilities"``.
+
+    Attributes
+    ----------
+    durations : dict
+        Maps the name of a stage to a list of durations in seconds of every call.
+    periods : dict
+        Maps the name of a stage which is executed once per period to a dictionary
+        which maps periods to lists of durations in seconds.
+
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.periods = defaultdict(lambda: defaultdict(list))
+        self._period_counters = {}
+        self._scope = []
+
+    def reset(self):
+        """Discard all measurements."""
+        self.durations.clear()
+        self.periods.clear()
+        self._period_counters.clear()
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        """Measure the duration of a block of code which encloses other stages."""
+        name = self._get_name(stage)
+        self._scope.append(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name].append(time.perf_counter() - start)
+            self._scope.pop()
+
+    def start_periods(self, stage, periods):
+        """Set the sequence of periods assigned to the following calls of a stage.
+
+        Stages which are called once per period do not always receive the period as an
+        argument. Instead, the n-th call of the stage is assigned to the n-th period of
+        ``periods``.
+
+        """
+        self._period_counters[stage] = iter(periods)
+
+    def wrap(self, func, stage, per_period=False):
+        """Wrap a function such that the duration of each call is recorded."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            out = func(*args, **kwargs)
+            duration = time.perf_counter() - start
+
+            name = self._get_name(stage)
+            self.durations[name].append(duration)
+            if per_period:
+                period = next(self._period_counters[stage])
+                self.periods[name][period].append(duration)
+
+            return out
+
+        return wrapper
+
+    @contextlib.contextmanager
+    def patch(self, module, name, stage, per_period=False):
+        """Replace ``module.name`` with a timed wrapper inside the context."""
+        original = getattr(module, name)
+        setattr(module, name, self.wrap(original, stage, per_period))
+        try:
+            yield
+        finally:
+            setattr(module, name, original)
+
+    def _get_name(self, stage):
+        return "/".join(self._scope + [stage])
+
+    def summarize(self, n_repetitions):
+        """Summarize the measurements.
+
+        Parameters
+        ----------
+        n_repetitions : int
+            Number of repetitions of the benchmark. Totals are divided by this number
+            to get the duration per repetition.
+
+        Returns
+        -------
+        summary : dict
+            Maps the name of each stage to a dictionary with the number of calls, the
+            total duration per repetition and, for stages executed per period, the
+            duration per repetition in each period.
+
+        """
+        summary = {}
+        for stage, durations in self.durations.items():
+            summary[stage] = {
+                "n_calls": len(durations) // n_repetitions,
+                "duration": sum(durations) / n_repetitions,
+            }
+            if stage in self.periods:
+                summary[stage]["periods"] = {
+                    int(period): sum(durations) / n_repetitions
+                    for period, durations in sorted(self.periods[stage].items())
+                }
+
+        return summary
@@ -0,0 +1,146 @@
+"""Benchmark the worst-case solver of respy against robupy.
+
+The script solves models with ambiguity twice. First, with the solver implemented in
+:func:`respy.shared._calculate_worst_case_expected_value`. Secondly, with the former
+implementation which called :func:`robupy.get_worst_case.get_worst_case_probs` for every
+state. The solution without ambiguity serves as a reference for the runtime.
+
+Run the script with
+
+.. code-block:: bash
+
+    $ python benchmark_worst_case_solver.py
+
+and find the results in ``worst_case_solver_results.txt``.
+
+"""
+import datetime as dt
+import json
+
+import numba as nb
+import numpy as np
+from robupy.get_worst_case import get_worst_case_probs
+
+import respy as rp
+import respy.solve
+from respy.shared import aggregate_keane_wolpin_utility
+from respy.tests.utils import apply_to_attributes_of_two_state_spaces
+
+MODELS = ["kw_94_one", "kw_97_basic"]
+ETAS = [0.01, 0.1, 0.5]
+N_PERIODS = {"kw_94_one": 40, "kw_97_basic": 20}
+N_REPETITIONS = 3
+
+
+@nb.guvectorize(
+    ["f8[:], f8[:], f8[:], f8[:, :], f8, f8, f8[:]"],
+    "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), (), () -> ()",
+    nopython=True,
+    target="parallel",
+)
+def _calculate_expected_value_functions_with_robupy(
+    wages, nonpecs, continuation_values, draws, delta, eta, expected_value_functions
+):
+    """Calculate the expected value functions like before with robupy."""
+    n_draws, n_choices = draws.shape
+    v = np.repeat(np.nan, n_draws)
+
+    for i in range(n_draws):
+
+        max_value_functions = 0
+
+        for j in range(n_choices):
+            value_function, _ = aggregate_keane_wolpin_utility(
+                wages[j], nonpecs[j], continuation_values[j], draws[i, j], delta
+            )
+
+            if value_function > max_value_functions:
+                max_value_functions = value_function
+
+        v[i] = max_value_functions
+
+    q = np.repeat(1.0 / n_draws, n_draws)
+    p = get_worst_case_probs(v, q, eta, is_cost=False)
+
+    emax = 0
+    for i in range(len(v)):
+        emax += v[i] * p[i]
+
+    expected_value_functions[0] = emax
+
+
+def calculate_expected_value_functions_with_robupy(
+    wages, nonpecs, continuation_values, draws, delta, eta, *args
+):
+    return _calculate_expected_value_functions_with_robupy(
+        wages, nonpecs, continuation_values, draws, delta, eta
+    )
+
+
+def time_solution(params, options, n_repetitions):
+    solve = rp.get_solve_func(params, options)
+
+    # Compile the functions.
+    state_space = solve(params)
+
+    start = dt.datetime.now()
+    for _ in range(n_repetitions):
+        state_space = solve(params)
+    end = dt.datetime.now()
+
+    return (end - start) / n_repetitions, state_space
+
+
+def main():
+    calculate_expected_value_functions = respy.solve.calculate_expected_value_functions
+
+    for model in MODELS:
+        params, options = rp.get_example_model(model, with_data=False)
+        options["n_periods"] = N_PERIODS[model]
+
+        params.loc[("eta", "eta"), "value"] = 0
+        duration_wo_ambiguity, _ = time_solution(params, options, N_REPETITIONS)
+
+        for eta in ETAS:
+            params.loc[("eta", "eta"), "value"] = eta
+
+            respy.solve.calculate_expected_value_functions = (
+                calculate_expected_value_functions
+            )
+            duration_respy, state_space = time_solution(params, options, N_REPETITIONS)
+
+            respy.solve.calculate_expected_value_functions = (
+                calculate_expected_value_functions_with_robupy
+            )
+            duration_robupy, state_space_robupy = time_solution(
+                params, options, N_REPETITIONS
+            )
+
+            max_abs_deviation = apply_to_attributes_of_two_state_spaces(
+                state_space.get_attribute("expected_value_functions"),
+                state_space_robupy.get_attribute("expected_value_functions"),
+                lambda x, y: np.abs(x - y).max(),
+            )
+            if isinstance(max_abs_deviation, dict):
+                max_abs_deviation = max(max_abs_deviation.values())
+
+            output = {
+                "model": model,
+                "n_periods": options["n_periods"],
+                "eta": eta,
+                "duration_wo_ambiguity": str(duration_wo_ambiguity),
+                "duration_respy": str(duration_respy),
+                "duration_robupy": str(duration_robupy),
+                "speedup": duration_robupy / duration_respy,
+                "max_abs_deviation": float(max_abs_deviation),
+            }
+
+            with open("worst_case_solver_results.txt", "a+") as file:
+                file.write(json.dumps(output))
+                file.write("\n")
+
+    respy.solve.calculate_expected_value_functions = calculate_expected_value_functions
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,10 @@ def main():
     limited by environment variables. ``respy`` has to be imported after the environment
     variables are set as Numpy, Numba and others load them at import time.
 
+    The durations of the instrumented stages, e.g., the backward induction or the
+    choice probabilities, are recorded with :class:`respy.Collector` to report the
+    speedups of single kernels.
+
     """
     model = sys.argv[1]
     maxfun = int(sys.argv[2])
@@ -39,8 +43,12 @@ def main():
     simulate = rp.get_simulate_func(params, options)
     df = simulate(params)
 
-    # Get the criterion function and the parameter vector.
+    # Get the criterion function and the parameter vector. Evaluate it once to compile
+    # all Numba functions before stages are recorded.
+    options["instrumentation"] = collector = rp.Collector()
     crit_func = rp.get_crit_func(params, options, df)
+    crit_func(params)
+    collector.reset()
 
     # Run the estimation
     start = dt.datetime.now()
@@ -50,6 +58,8 @@ def main():
 
     end = dt.datetime.now()
 
+    stages = collector.summarize()["duration"].to_dict()
+
     # Aggregate information
     output = {
         "model": model,
@@ -58,6 +68,7 @@ def main():
         "start": str(start),
         "end": str(end),
         "duration": str(end - start),
+        "stages": stages,
     }
 
     # Save time to file
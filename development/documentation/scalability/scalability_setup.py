@@ -1,25 +1,65 @@
+import json
 import subprocess
 from pathlib import Path
 
+import pandas as pd
+
 
 def main():
     """Run the scalability exercise.
 
     Define the model, a list with different number of threads and a maximum number of
-    function evaluations.
+    function evaluations. After all runs, the speedups of the instrumented stages
+    relative to the run with the fewest threads are reported.
 
     """
     model = "kw_97_basic"
     maxfun = 3
+    n_threads_list = [2, 4, 6, 8, 10, 12, 14]
 
     filepath = Path(__file__).resolve().parent / "run_single_scalability_exercise.py"
 
     # Run Python
-    for n_threads in [2, 4, 6, 8, 10, 12, 14]:
+    for n_threads in n_threads_list:
         subprocess.check_call(
             ["python", str(filepath), model, str(maxfun), str(n_threads)]
         )
 
+    speedups = compute_speedups_of_stages(
+        Path("scalability_results.txt"), len(n_threads_list)
+    )
+    print(speedups.round(2).to_string())  # noqa: T001
+
+
+def compute_speedups_of_stages(path, n_runs):
+    """Compute the speedups of the instrumented stages.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Path to the file with the results of single runs. Each line is a JSON object.
+    n_runs : int
+        Only the last ``n_runs`` lines of the file are used as results of previous
+        exercises are not deleted.
+
+    Returns
+    -------
+    speedups : pandas.DataFrame
+        DataFrame with the number of threads as index and stages as columns containing
+        the speedup relative to the run with the fewest threads.
+
+    """
+    lines = path.read_text().splitlines()[-n_runs:]
+    results = [json.loads(line) for line in lines]
+
+    durations = pd.DataFrame(
+        {result["n_threads"]: result["stages"] for result in results}
+    ).T.sort_index()
+    speedups = durations.iloc[0] / durations
+    speedups.index.name = "n_threads"
+
+    return speedups
+
 
 if __name__ == "__main__":
     main()
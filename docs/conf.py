@@ -49,7 +49,6 @@ nitpicky = True
 autodoc_mock_imports = [
     "chaospy",
     "estimagic",
-    "joblib",
     "numba",
     "numpy",
     "pandas",
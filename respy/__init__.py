@@ -14,6 +14,7 @@ import sys
 import pytest
 
 from respy.config import ROOT_DIR
+from respy.instrumentation import Collector  # noqa: F401
 from respy.interface import get_example_model  # noqa: F401
 from respy.interface import get_parameter_constraints  # noqa: F401
 from respy.likelihood import get_crit_func  # noqa: F401
@@ -2,6 +2,7 @@
 import numpy as np
 from estimagic.optimization.utilities import robust_cholesky
 from numba import guvectorize
+from numba import njit
 
 from respy.config import MAX_FLOAT
 from respy.config import MAX_LOG_FLOAT
@@ -57,7 +58,64 @@ def create_draws_and_log_prob_wages(
         of the observed wages, correcting for measurement error if necessary.
 
     """
-    n_obs, n_choices = wages_systematic.shape
+    updated_means, log_prob_wages, chol_indices = update_means_and_log_prob_wages(
+        log_wage_observed, wages_systematic, choices, shocks_cholesky, n_wages, meas_sds
+    )
+    updated_chols = update_cholesky_factors(
+        shocks_cholesky, n_wages, meas_sds, has_meas_error
+    )
+
+    draws = calculate_conditional_draws(
+        base_draws, updated_means, updated_chols, chol_indices, MAX_LOG_FLOAT
+    )
+
+    return draws, log_prob_wages
+
+
+def update_means_and_log_prob_wages(
+    log_wage_observed, wages_systematic, choices, shocks_cholesky, n_wages, meas_sds
+):
+    """Evaluate the likelihood of observed wages and update the means of the shocks.
+
+    The function does the same as :func:`update_mean_and_evaluate_likelihood`, but
+    vectorized over all observations. Observations can only differ in the sector of the
+    observed wage or in not having an observed wage. Thus, the rows of the covariance
+    matrix and the variances of the observed shocks are prepared once for each of the
+    ``n_wages + 1`` patterns. Then, the conditional mean of each observation is a
+    rank-one update, the row of the covariance matrix scaled by the observed shock.
+
+    Parameters
+    ----------
+    log_wage_observed : numpy.ndarray
+        Array with shape (n_obs * n_types,) containing observed log wages.
+    wages_systematic : numpy.ndarray
+        Array with shape (n_obs * n_types, n_choices) containing systematic wages.
+    choices : numpy.ndarray
+        Array with shape (n_obs * n_types,) containing observed choices.
+    shocks_cholesky : numpy.ndarray
+        Array with shape (n_choices, n_choices) with the lower triangular Cholesky
+        factor of the covariance matrix of the shocks.
+    n_wages : int
+        Number of wage sectors
+    meas_sds : numpy.ndarray
+        Array with shape (n_choices,) containing standard deviations of the measurement
+        errors of observed reward components.
+
+    Returns
+    -------
+    updated_means : numpy.ndarray
+        Array with shape (n_obs * n_types, n_choices) containing the means of the shocks
+        conditional on the observed wages.
+    log_prob_wages : numpy.ndarray
+        Array with shape (n_obs * n_types,) containing the unconditional log likelihood
+        of the observed wages, correcting for measurement error if necessary.
+    chol_indices : numpy.ndarray
+        Array with shape (n_obs * n_types,) containing the indices of the updated
+        Cholesky factors, see :func:`update_cholesky_factors`, which belong to the
+        observations.
+
+    """
+    n_choices = len(shocks_cholesky)
 
     choices = choices.astype(np.uint16)
     relevant_systematic_wages = np.choose(choices, wages_systematic.T)
@@ -66,10 +124,50 @@ def create_draws_and_log_prob_wages(
     )
     cov = shocks_cholesky @ shocks_cholesky.T
 
-    updated_means, log_prob_wages = update_mean_and_evaluate_likelihood(
-        log_wage_observed, log_wage_systematic, cov, choices, meas_sds
+    # Prepare the covariances and variances of each pattern. The last pattern belongs
+    # to observations without wage. Its variance is one to avoid a division by zero.
+    pattern_covs = np.zeros((n_wages + 1, n_choices))
+    pattern_covs[:n_wages] = cov[:n_wages]
+    pattern_sigmas_squared = np.ones(n_wages + 1)
+    pattern_sigmas_squared[:n_wages] = np.diag(cov)[:n_wages] + meas_sds[:n_wages] ** 2
+    pattern_log_sigmas = np.log(np.sqrt(pattern_sigmas_squared))
+
+    shocks = log_wage_observed - log_wage_systematic
+    is_observed = np.isfinite(shocks)
+    shocks = np.where(is_observed, shocks, 0)
+    chol_indices = np.where(np.isfinite(log_wage_observed), choices, n_wages)
+
+    sigmas_squared = pattern_sigmas_squared[chol_indices]
+    updated_means = (
+        pattern_covs[chol_indices]
+        * shocks.reshape(-1, 1)
+        / sigmas_squared.reshape(-1, 1)
     )
 
+    invariant = -np.log(2 * np.pi) / 2
+    log_prob_wages = np.where(
+        is_observed,
+        invariant
+        - log_wage_observed
+        - pattern_log_sigmas[chol_indices]
+        - shocks ** 2 / (2 * sigmas_squared),
+        0,
+    )
+
+    return updated_means, log_prob_wages, chol_indices
+
+
+def update_cholesky_factors(shocks_cholesky, n_wages, meas_sds, has_meas_error):
+    """Calculate the Cholesky factors of the shocks for each observable wage.
+
+    Returns
+    -------
+    updated_chols : numpy.ndarray
+        Array of (shape n_wages + 1, n_choices, n_choices) with the cholesky factors
+        of the updated covariance matrices for each possible observed shock. The
+        last element corresponds to not observing any shock.
+
+    """
     if has_meas_error:
         updated_chols = update_cholcov_with_measurement_error(
             shocks_cholesky, meas_sds, n_wages
@@ -77,12 +175,7 @@ def create_draws_and_log_prob_wages(
     else:
         updated_chols = update_cholcov(shocks_cholesky, n_wages)
 
-    chol_indices = np.where(np.isfinite(log_wage_observed), choices, n_wages)
-    draws = calculate_conditional_draws(
-        base_draws, updated_means, updated_chols, chol_indices, MAX_LOG_FLOAT
-    )
-
-    return draws, log_prob_wages
+    return updated_chols
 
 
 @guvectorize(
@@ -275,8 +368,50 @@ def update_cholcov(shocks_cholesky, n_wages):
     return updated_chols
 
 
+@njit
+def calculate_conditional_draw(
+    base_draw, updated_mean, updated_chol, n_wages, max_log_float, conditional_draw
+):
+    """Calculate a single conditional draw from a base draw.
+
+    The function is shared by :func:`calculate_conditional_draws` and the kernels which
+    create conditional draws on the fly.
+
+    Parameters
+    ----------
+    base_draw : numpy.ndarray
+        Array with shape (n_choices,) containing iid standard normal draws.
+    updated_mean : numpy.ndarray
+        Array with shape (n_choices,) containing the conditional mean.
+    updated_chol : numpy.ndarray
+        Array with shape (n_choices, n_choices) containing the Cholesky factor of the
+        conditional covariance.
+    n_wages : int
+        Number of wage sectors whose shocks are log normally distributed.
+    max_log_float : float
+        Value at which numbers soon to be exponentiated are clipped.
+    conditional_draw : numpy.ndarray
+        Array with shape (n_choices,) which is filled with the conditional draw.
+
+    """
+    n_choices = base_draw.shape[0]
+
+    for i in range(n_choices):
+        cd = updated_mean[i]
+        for j in range(i + 1):
+            cd += base_draw[j] * updated_chol[i, j]
+        if i < n_wages:
+            if cd > max_log_float:
+                cd = max_log_float
+            cd = np.exp(cd)
+        conditional_draw[i] = cd
+
+
 @guvectorize(
-    ["f8[:, :], f8[:], f8[:, :, :], u2, f8, f8[:, :]"],
+    [
+        "f4[:, :], f8[:], f8[:, :, :], u2, f8, f4[:, :]",
+        "f8[:, :], f8[:], f8[:, :, :], u2, f8, f8[:, :]",
+    ],
     "(n_draws, n_choices), (n_choices), (n_wages_plus_one, n_choices, n_choices), (), "
     "() -> (n_draws, n_choices)",
     nopython=True,
@@ -289,6 +424,10 @@ def calculate_conditional_draws(
     We need to pass ``max_log_float`` to the function, because the global variables
     ``MAX_LOG_FLOAT`` cannot be used directly withing the guvectorize.
 
+    If the base draws are in single precision, the conditional draws are returned in
+    single precision as well. The affine transformation is still computed in double
+    precision.
+
     Parameters
     ----------
     base_draws : np.ndarray
@@ -311,19 +450,18 @@ def calculate_conditional_draws(
         draws from the conditional distribution of the shocks.
 
     """
-    n_draws, n_choices = base_draws.shape
+    n_draws = base_draws.shape[0]
     n_wages = len(updated_chols) - 1
 
     for d in range(n_draws):
-        for i in range(n_choices):
-            cd = updated_mean[i]
-            for j in range(i + 1):
-                cd += base_draws[d, j] * updated_chols[chol_index, i, j]
-            if i < n_wages:
-                if cd > max_log_float:
-                    cd = max_log_float
-                cd = np.exp(cd)
-            conditional_draw[d, i] = cd
+        calculate_conditional_draw(
+            base_draws[d],
+            updated_mean,
+            updated_chols[chol_index],
+            n_wages,
+            max_log_float,
+            conditional_draw[d],
+        )
 
 
 def make_cholesky_unique(chol):
@@ -58,7 +58,45 @@ TOL_REGRESSION_TESTS = 1e-10
 
 SEED_STARTUP_ITERATION_GAP = 100
 
+WORKER_THREAD_NAME_PREFIX = "respy-worker"
+"""str : Prefix for the names of threads which process dense sub state spaces.
+
+See Also
+--------
+respy.parallelization._get_thread_pool
+
+"""
+
+EMAX_STATE_TILE_SIZE = 16
+"""int : Number of states which are processed together against a tile of draws.
+
+See Also
+--------
+respy.shared.calculate_expected_value_functions
+
+"""
+
+EMAX_DRAW_TILE_SIZE = 64
+"""int : Number of draws which are processed together for a tile of states.
+
+See Also
+--------
+respy.shared.calculate_expected_value_functions
+
+"""
+
+BASE_DRAWS_CACHE_SIZE = 8
+"""int : Number of arrays of base draws which are cached in memory.
+
+See Also
+--------
+respy.shared.create_base_draws
+
+"""
+
 DEFAULT_OPTIONS = {
+    "ambiguity_max_iterations": 100,
+    "ambiguity_tolerance": 1e-12,
     "estimation_draws": 200,
     "estimation_seed": 1,
     "estimation_tau": 500,
@@ -70,6 +108,14 @@ DEFAULT_OPTIONS = {
     "core_state_space_filters": [],
     "inadmissible_states": {},
     "monte_carlo_sequence": "sobol",
+    "n_jobs": 1,
+    "partial_resolve": False,
+    "memory_map_directory": None,
+    "instrumentation": None,
+    "cache_directory": None,
+    "estimation_chunk_size": None,
+    "precision": "float64",
+    "estimation_target": "parallel",
 }
 
 KEANE_WOLPIN_1994_MODELS = [f"kw_94_{suffix}" for suffix in ["one", "two", "three"]]
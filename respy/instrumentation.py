@@ -0,0 +1,138 @@
+"""This module contains the code to instrument the stages of respy.
+
+The instrumentation is enabled by passing a callable as ``options["instrumentation"]``.
+After each instrumented stage, the callable receives a dictionary with the name of the
+stage, the duration in seconds and information on the sizes of the processed arrays.
+:class:`Collector` is a callable which stores all records and summarizes them.
+
+The instrumentation only wraps Python code around the Numba kernels. If it is disabled,
+:func:`instrument` returns a shared no-op context manager.
+
+"""
+import time
+
+import pandas as pd
+
+
+class Collector:
+    """Collect the records of instrumented stages.
+
+    Pass an instance as ``options["instrumentation"]``. Copies of the options share the
+    same collector.
+
+    Attributes
+    ----------
+    records : list
+        List of dictionaries with the name of the stage, the duration in seconds and
+        further information like the period or the number of states.
+
+    Examples
+    --------
+    >>> import respy as rp
+    >>> params, options = rp.get_example_model("kw_94_one", with_data=False)
+    >>> options["instrumentation"] = collector = rp.Collector()
+    >>> solve = rp.get_solve_func(params, options)
+    >>> state_space = solve(params)
+    >>> collector.summarize().loc["solve", "n_calls"]
+    1
+
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def reset(self):
+        """Discard all records."""
+        self.records.clear()
+
+    def to_frame(self):
+        """Return the records as a :class:`pandas.DataFrame`."""
+        return pd.DataFrame(self.records)
+
+    def summarize(self):
+        """Summarize the number of calls and the durations of each stage.
+
+        Returns
+        -------
+        summary : pandas.DataFrame
+            DataFrame indexed by stages with the number of calls, the total duration and
+            the mean duration per call in seconds.
+
+        """
+        df = self.to_frame()
+        summary = df.groupby("stage")["duration"].agg(["count", "sum", "mean"])
+        summary.columns = ["n_calls", "duration", "mean_duration"]
+
+        return summary
+
+
+class _Instrument:
+    """Measure the duration of a stage and pass a record to the callback."""
+
+    __slots__ = ("callback", "record", "start")
+
+    def __init__(self, callback, record):
+        self.callback = callback
+        self.record = record
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc_info):
+        self.record["duration"] = time.perf_counter() - self.start
+        self.callback(self.record)
+
+
+class _DisabledInstrument:
+    """No-op replacement of :class:`_Instrument` if instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_DISABLED_INSTRUMENT = _DisabledInstrument()
+
+
+def instrument(stage, options, **info):
+    """Instrument a stage.
+
+    Parameters
+    ----------
+    stage : str
+        Name of the stage.
+    options : dict
+        Options of the model. The callback is stored in ``options["instrumentation"]``.
+    **info
+        Information like array sizes which is added to the record. Pass only values
+        which are cheap to compute as they are also computed if the instrumentation is
+        disabled.
+
+    Returns
+    -------
+    context_manager
+        Context manager which records the duration of the enclosed block. Inside the
+        block, the record is available as the target of the ``with`` statement and can
+        be extended with information which is only available after the stage. If the
+        instrumentation is disabled, the target is :data:`None`.
+
+    """
+    callback = options.get("instrumentation")
+    if callback is None:
+        return _DISABLED_INSTRUMENT
+    else:
+        return _Instrument(callback, {"stage": stage, **info})
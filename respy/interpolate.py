@@ -5,6 +5,7 @@ import numba as nb
 import numpy as np
 
 from respy.config import MAX_LOG_FLOAT
+from respy.instrumentation import instrument
 from respy.parallelization import combine_and_split_interpolation
 from respy.parallelization import parallelize_across_dense_dimensions
 from respy.shared import calculate_expected_value_functions
@@ -13,9 +14,15 @@ from respy.shared import calculate_value_functions_and_flow_utilities
 
 def interpolate(state_space, period_draws_emax_risk, period, optim_paras, options):
     """Interface to switch between different interpolation routines."""
-    period_expected_value_functions = _kw_94_interpolation(
-        state_space, period_draws_emax_risk, period, optim_paras, options
-    )
+    with instrument(
+        "interpolate",
+        options,
+        period=period,
+        interpolation_points=options["interpolation_points"],
+    ):
+        period_expected_value_functions = _kw_94_interpolation(
+            state_space, period_draws_emax_risk, period, optim_paras, options
+        )
 
     return period_expected_value_functions
 
@@ -75,9 +82,9 @@ def _kw_94_interpolation(
 
     """
     n_wages = len(optim_paras["choices_w_wage"])
-    n_core_states_in_period = state_space.core.query("period == @period").shape[0]
+    n_core_states_in_period = state_space.get_n_states_in_period(period)
 
-    seed = _get_seeds_for_interpolation(state_space, options)
+    seed = get_seeds_for_interpolation(state_space, options)
     interp_points = _split_interpolation_points_evenly(state_space, options)
 
     not_interpolated = _get_not_interpolated_indicator(
@@ -94,7 +101,12 @@ def _kw_94_interpolation(
     continuation_values = state_space.get_continuation_values(period=period)
 
     exogenous, max_emax = _compute_rhs_variables(
-        wages, nonpecs, continuation_values, expected_shocks, optim_paras["delta"]
+        wages,
+        nonpecs,
+        continuation_values,
+        expected_shocks,
+        optim_paras["delta"],
+        n_jobs=options["n_jobs"],
     )
 
     endogenous = _compute_lhs_variable(
@@ -106,6 +118,10 @@ def _kw_94_interpolation(
         period_draws_emax_risk,
         optim_paras["delta"],
         optim_paras["eta"],
+        options["ambiguity_max_iterations"],
+        options["ambiguity_tolerance"],
+        options["precision"],
+        n_jobs=options["n_jobs"],
     )
 
     # Create prediction model based on the random subset of points where the EMAX is
@@ -118,7 +134,13 @@ def _kw_94_interpolation(
     return period_expected_value_functions
 
 
-def _get_seeds_for_interpolation(state_space, options):
+def get_seeds_for_interpolation(state_space, options):
+    """Get the seeds for the interpolation of a period.
+
+    Each dense index receives its own seed. The seeds are consumed from
+    ``options["solution_seed_iteration"]``.
+
+    """
     if hasattr(state_space, "sub_state_spaces"):
         seed = {
             dense_idx: next(options["solution_seed_iteration"])
@@ -168,9 +190,11 @@ def _get_not_interpolated_indicator(interpolation_points, n_states, seed):
         Array of shape (n_states,) indicating states which will not be interpolated.
 
     """
-    np.random.seed(seed)
+    # Use a local random number generator to leave the global state untouched. It yields
+    # the same indices as seeding the global generator.
+    random_state = np.random.RandomState(seed)
 
-    indices = np.random.choice(n_states, size=interpolation_points, replace=False)
+    indices = random_state.choice(n_states, size=interpolation_points, replace=False)
     not_interpolated = np.zeros(n_states, dtype="bool")
     not_interpolated[indices] = True
 
@@ -232,6 +256,9 @@ def _compute_lhs_variable(
     draws,
     delta,
     eta,
+    max_iterations,
+    tolerance,
+    precision,
 ):
     """Calculate left-hand side variable for all states which are not interpolated.
 
@@ -239,6 +266,10 @@ def _compute_lhs_variable(
     variable is the expected value function minus the maximum of value function with the
     expected shocks.
 
+    The states of the subset are passed as indices to the kernel of the expected value
+    functions which reads rewards and continuation values in place. Thus, no copies of
+    the subset are created.
+
     Parameters
     ----------
     wages : numpy.ndarray
@@ -257,17 +288,31 @@ def _compute_lhs_variable(
         Array with shape (n_draws, n_choices) containing draws.
     delta : float
         Discount factor.
+    eta : float
+        The size of the ambiguity set.
+    max_iterations : int
+        Maximum number of iterations to find the worst-case distribution of a state.
+    tolerance : float
+        Tolerance for the divergence of the worst-case distribution.
+    precision : {"float64", "float32"}
+        Precision of the value functions in the Monte Carlo integration.
 
     """
+    state_indices = np.flatnonzero(not_interpolated)
+
     expected_value_functions = calculate_expected_value_functions(
-        wages[not_interpolated],
-        nonpec[not_interpolated],
-        continuation_values[not_interpolated],
+        wages,
+        nonpec,
+        continuation_values,
         draws,
         delta,
         eta,
+        max_iterations,
+        tolerance,
+        precision,
+        state_indices,
     )
-    endogenous = expected_value_functions - max_value_functions[not_interpolated]
+    endogenous = expected_value_functions - max_value_functions[state_indices]
 
     return endogenous
 
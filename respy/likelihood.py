@@ -7,14 +7,17 @@ import numpy as np
 import pandas as pd
 from scipy import special
 
-from respy.conditional_draws import create_draws_and_log_prob_wages
+from respy.conditional_draws import calculate_conditional_draw
+from respy.conditional_draws import update_cholesky_factors
+from respy.conditional_draws import update_means_and_log_prob_wages
 from respy.config import COVARIATES_DOT_PRODUCT_DTYPE
 from respy.config import INDEXER_INVALID_INDEX
 from respy.config import MAX_FLOAT
+from respy.config import MAX_LOG_FLOAT
 from respy.config import MIN_FLOAT
+from respy.instrumentation import instrument
 from respy.parallelization import parallelize_across_dense_dimensions
 from respy.parallelization import split_and_combine_df
-from respy.parallelization import split_and_combine_likelihood
 from respy.pre_processing.data_checking import check_estimation_data
 from respy.pre_processing.model_processing import process_params_and_options
 from respy.pre_processing.process_covariates import identify_necessary_covariates
@@ -22,15 +25,24 @@ from respy.shared import aggregate_keane_wolpin_utility
 from respy.shared import compute_covariates
 from respy.shared import convert_labeled_variables_to_codes
 from respy.shared import create_base_draws
+from respy.shared import convert_dictionary_keys_to_dense_indices
 from respy.shared import create_core_state_space_columns
+from respy.shared import create_dense_state_space_columns
 from respy.shared import downcast_to_smallest_dtype
 from respy.shared import generate_column_dtype_dict_for_estimation
+from respy.shared import get_first_observations_of_individuals
+from respy.shared import is_worker_thread
 from respy.shared import rename_labels_to_internal
 from respy.solve import get_solve_func
 
 
 def get_crit_func(
-    params, options, df, return_scalar=True, return_comparison_plot_data=False
+    params,
+    options,
+    df,
+    return_scalar=True,
+    return_comparison_plot_data=False,
+    batch=False,
 ):
     """Get the criterion function.
 
@@ -53,18 +65,30 @@ def get_crit_func(
     return_comparison_plot_data : bool, default False
         Indicator for whether a :class:`pandas.DataFrame` with various contributions for
         the visualization with estimagic should be returned.
+    batch : bool, default False
+        Indicator for whether the criterion function accepts a
+        :class:`pandas.DataFrame` where each column is a parameter vector. The state
+        space, the processed data and the draws are shared between all parameter
+        vectors. See :func:`log_like_batch`.
 
     Returns
     -------
-    criterion_function : :func:`log_like`
+    criterion_function : :func:`log_like` or :func:`log_like_batch`
         Criterion function where all arguments except the parameter vector are set.
 
     Raises
     ------
     AssertionError
         If data has not the expected format.
+    ValueError
+        If ``batch=True`` is combined with ``return_comparison_plot_data=True``.
 
     """
+    if batch and return_comparison_plot_data:
+        raise ValueError(
+            "Comparison plot data cannot be returned for a batch of parameters."
+        )
+
     optim_paras, options = process_params_and_options(params, options)
 
     optim_paras = _adjust_optim_paras_for_estimation(optim_paras, df)
@@ -74,7 +98,7 @@ def get_crit_func(
     solve = get_solve_func(params, options)
     state_space = solve.keywords["state_space"]
 
-    df, type_covariates = _process_estimation_data(
+    df, estimation_data, type_covariates = _process_estimation_data(
         df, state_space, optim_paras, options
     )
 
@@ -86,18 +110,31 @@ def get_crit_func(
         ),
         next(options["estimation_seed_startup"]),
         options["monte_carlo_sequence"],
+        options["cache_directory"],
     )
 
-    criterion_function = partial(
-        log_like,
-        df=df,
-        base_draws_est=base_draws_est,
-        solve=solve,
-        type_covariates=type_covariates,
-        options=options,
-        return_scalar=return_scalar,
-        return_comparison_plot_data=return_comparison_plot_data,
-    )
+    if batch:
+        criterion_function = partial(
+            log_like_batch,
+            estimation_data=estimation_data,
+            base_draws_est=base_draws_est,
+            solve=solve,
+            type_covariates=type_covariates,
+            options=options,
+            return_scalar=return_scalar,
+        )
+    else:
+        criterion_function = partial(
+            log_like,
+            df=df,
+            estimation_data=estimation_data,
+            base_draws_est=base_draws_est,
+            solve=solve,
+            type_covariates=type_covariates,
+            options=options,
+            return_scalar=return_scalar,
+            return_comparison_plot_data=return_comparison_plot_data,
+        )
 
     return criterion_function
 
@@ -105,6 +142,7 @@ def get_crit_func(
 def log_like(
     params,
     df,
+    estimation_data,
     base_draws_est,
     solve,
     type_covariates,
@@ -121,8 +159,11 @@ def log_like(
     params : pandas.Series
         Parameter Series
     df : pandas.DataFrame
-        The DataFrame contains choices, log wages, the indices of the states for the
-        different types.
+        The DataFrame contains choices, log wages, the indices of the states and of
+        their child states. It is only used for the comparison plot data.
+    estimation_data : dict
+        The arrays of the data which are needed to compute the likelihood contributions,
+        see :func:`_create_estimation_data`.
     base_draws_est : numpy.ndarray
         Set of draws to calculate the probability of observed wages.
     solve : :func:`~respy.solve.solve`
@@ -135,8 +176,13 @@ def log_like(
 
     state_space = solve(params)
 
-    contribs, df, log_type_probabilities = _internal_log_like_obs(
-        state_space, df, base_draws_est, type_covariates, optim_paras, options
+    contribs, loglikes, log_type_probabilities = _internal_log_like_obs(
+        state_space,
+        estimation_data,
+        base_draws_est,
+        type_covariates,
+        optim_paras,
+        options,
     )
 
     # Return mean log likelihood or log likelihood contributions.
@@ -144,15 +190,80 @@ def log_like(
 
     if return_comparison_plot_data:
         comparison_plot_data = _create_comparison_plot_data(
-            df, log_type_probabilities, optim_paras
+            df, loglikes, log_type_probabilities, optim_paras
         )
         out = (out, comparison_plot_data)
 
     return out
 
 
+def log_like_batch(
+    params_batch,
+    estimation_data,
+    base_draws_est,
+    solve,
+    type_covariates,
+    options,
+    return_scalar,
+):
+    """Criterion function for a batch of parameter vectors.
+
+    The function evaluates the likelihood for many parameter vectors on the same data
+    which is needed for population-based optimizers, parameter sweeps or numerical
+    derivatives. The state space with its indexer and the indices of child states, the
+    processed data and the draws are created once in :func:`get_crit_func` and shared
+    by all parameter vectors. Only the solution and the likelihood contributions are
+    computed for each vector.
+
+    Parameters
+    ----------
+    params_batch : pandas.DataFrame
+        DataFrame with the same index as the parameters of the model where each column
+        is a parameter vector.
+    estimation_data : dict
+        The arrays of the data which are needed to compute the likelihood contributions,
+        see :func:`_create_estimation_data`.
+    base_draws_est : numpy.ndarray
+        Set of draws to calculate the probability of observed wages.
+    solve : :func:`~respy.solve.solve`
+        Function which solves the model with new parameters.
+    options : dict
+        Contains model options.
+
+    Returns
+    -------
+    out : numpy.ndarray
+        Array with shape (n_params,) containing the mean log likelihood of each
+        parameter vector if ``return_scalar=True``. Otherwise, an array with shape
+        (n_params, n_individuals) containing the log likelihood contributions.
+
+    """
+    contribs = []
+    for column in params_batch:
+        params = params_batch[column]
+        optim_paras, options_ = process_params_and_options(params, options)
+
+        state_space = solve(params)
+
+        contribs_, _, _ = _internal_log_like_obs(
+            state_space,
+            estimation_data,
+            base_draws_est,
+            type_covariates,
+            optim_paras,
+            options_,
+        )
+        contribs.append(contribs_)
+
+    contribs = np.vstack(contribs)
+
+    out = contribs.mean(axis=1) if return_scalar else contribs
+
+    return out
+
+
 def _internal_log_like_obs(
-    state_space, df, base_draws_est, type_covariates, optim_paras, options
+    state_space, estimation_data, base_draws_est, type_covariates, optim_paras, options
 ):
     """Calculate the likelihood contribution of each individual in the sample.
 
@@ -163,16 +274,19 @@ def _internal_log_like_obs(
     After that, the result is multiplied with the type-specific shares which yields the
     contribution to the likelihood for each individual.
 
+    All information on the data is prepared once in :func:`_create_estimation_data`
+    such that the evaluation only consists of operations on arrays.
+
     Parameters
     ----------
     state_space : :class:`~respy.state_space.StateSpace`
         Class of state space.
-    df : pandas.DataFrame
-        The DataFrame contains choices, log wages, the indices of the states for the
-        different types.
+    estimation_data : dict
+        The arrays of the data which are needed to compute the likelihood contributions,
+        see :func:`_create_estimation_data`.
     base_draws_est : numpy.ndarray
-        Array with shape (n_periods, n_draws, n_choices) containing i.i.d. draws from
-        standard normal distributions.
+        Array with shape (n_observations * n_types, n_draws, n_choices) containing
+        i.i.d. draws from standard normal distributions.
     type_covariates : pandas.DataFrame or None
         If the model includes types, this is a :class:`pandas.DataFrame` containing the
         covariates to compute the type probabilities.
@@ -186,106 +300,341 @@ def _internal_log_like_obs(
     contribs : numpy.ndarray
         Array with shape (n_individuals,) containing contributions of individuals in the
         empirical data.
-    df : pandas.DataFrame
-        Contains log wages, choices and
+    loglikes : dict
+        Dictionary with keys ``"choice"`` and ``"wage"`` and arrays with shape
+        (n_observations, n_types) containing the log likelihood contributions of
+        choices and wages.
+    log_type_probabilities : pandas.DataFrame or None
+        The log type probabilities of each individual if the model includes types.
 
     """
-    df = df.copy()
-
     n_types = optim_paras["n_types"]
+    n_observations = estimation_data["n_observations"]
 
     wages = state_space.get_attribute("wages")
     nonpecs = state_space.get_attribute("nonpecs")
     expected_value_functions = state_space.get_attribute("expected_value_functions")
 
-    df = _compute_wage_and_choice_likelihood_contributions(
-        df,
-        base_draws_est,
-        wages,
-        nonpecs,
-        expected_value_functions,
-        optim_paras=optim_paras,
-        options=options,
+    # The Cholesky factors of the shocks conditional on the observed wages only depend
+    # on the sector of the wage and are shared by all dense indices.
+    updated_chols = update_cholesky_factors(
+        optim_paras["shocks_cholesky"],
+        len(optim_paras["choices_w_wage"]),
+        optim_paras["meas_error"],
+        optim_paras["has_meas_error"],
     )
 
-    # Aggregate choice probabilities and wage densities to log likes per observation.
-    loglikes = (
-        df.groupby(["identifier", "period", "type"])[["loglike_choice", "loglike_wage"]]
-        .first()
-        .unstack("type")
-        if optim_paras["n_types"] >= 2
-        else df[["loglike_choice", "loglike_wage"]]
-    )
-    per_observation_loglikes = loglikes["loglike_choice"] + loglikes["loglike_wage"]
-    per_individual_loglikes = per_observation_loglikes.groupby("identifier").sum()
+    with instrument(
+        "likelihood_contributions",
+        options,
+        n_observations=n_observations,
+        n_draws=base_draws_est.shape[1],
+        nbytes_draws=base_draws_est.nbytes,
+    ):
+        out = _compute_wage_and_choice_likelihood_contributions(
+            estimation_data["observations"],
+            base_draws_est,
+            updated_chols,
+            wages,
+            nonpecs,
+            expected_value_functions,
+            optim_paras=optim_paras,
+            options=options,
+        )
+
+    # Collect the log likelihoods of all groups in arrays with one column per type.
+    loglikes = {
+        kind: np.full((n_observations, n_types), np.nan) for kind in ["choice", "wage"]
+    }
+    if isinstance(out, dict):
+        for dense_idx, (choice_loglikes, wage_loglikes) in out.items():
+            observations = estimation_data["observations"][dense_idx]
+            rows, type_ = observations["rows"], observations["type"]
+            loglikes["choice"][rows, type_] = choice_loglikes
+            loglikes["wage"][rows, type_] = wage_loglikes
+    else:
+        loglikes["choice"][:, 0], loglikes["wage"][:, 0] = out
 
     if n_types >= 2:
         # To not alter the attribute in the functools.partial, create a copy.
         type_covariates = type_covariates.copy()
-        # Weight each type-specific individual log likelihood with the type probability.
         log_type_probabilities = _compute_log_type_probabilities(
             type_covariates, optim_paras, options
         )
-        weighted_loglikes = per_individual_loglikes + log_type_probabilities
-
-        contribs = special.logsumexp(weighted_loglikes, axis=1)
+        log_type_probabilities_ = log_type_probabilities.to_numpy(dtype=np.float64)
     else:
-        contribs = per_individual_loglikes.to_numpy().flatten()
         log_type_probabilities = None
+        log_type_probabilities_ = None
+
+    # Aggregate choice probabilities and wage densities to log likes per individual and
+    # weight each type-specific individual log likelihood with the type probability.
+    contribs = compute_log_likelihoods_of_individuals(
+        loglikes, estimation_data["first_observations"], log_type_probabilities_
+    )
+
+    return contribs, loglikes, log_type_probabilities
+
+
+def compute_log_likelihoods_of_individuals(
+    loglikes,
+    first_observations,
+    log_type_probabilities=None,
+    return_posterior_type_probabilities=False,
+):
+    r"""Compute the log likelihood of each individual as a mixture over types.
+
+    The log likelihood of individual :math:`i` is
+
+    .. math::
+
+        \log L_i = \log \sum_t \exp\left(
+            \log \pi_{it} + \sum_{p} (\log l^c_{ipt} + \log l^w_{ipt})
+        \right)
+
+    where :math:`\pi_{it}` is the probability of type :math:`t` and :math:`l^c_{ipt}`
+    and :math:`l^w_{ipt}` are the likelihoods of the choice and the wage in period
+    :math:`p`. The sums over the observations of an individual and the log-sum-exp over
+    types are computed in one pass over the observations by
+    :func:`_compute_log_likelihoods_of_individuals`.
+
+    The posterior type probabilities
+
+    .. math::
+
+        \Pr(t \mid i) = \exp\left(
+            \log \pi_{it} + \sum_{p} (\log l^c_{ipt} + \log l^w_{ipt}) - \log L_i
+        \right)
+
+    are a by-product which is, for example, needed for the E-step of the EM algorithm.
+
+    Parameters
+    ----------
+    loglikes : dict
+        Dictionary with keys ``"choice"`` and ``"wage"`` and arrays with shape
+        (n_observations, n_types) containing the log likelihood contributions.
+    first_observations : numpy.ndarray
+        Array with shape (n_individuals,) containing the positions of the first
+        observation of each individual. The observations of an individual have to be
+        stored consecutively.
+    log_type_probabilities : numpy.ndarray, default None
+        Array with shape (n_individuals, n_types) containing the log type probabilities.
+        ``None`` is only allowed for models with one type.
+    return_posterior_type_probabilities : bool, default False
+        Indicator for whether the posterior type probabilities are returned.
+
+    Returns
+    -------
+    contribs : numpy.ndarray
+        Array with shape (n_individuals,) containing the clipped log likelihood
+        contributions of individuals.
+    posterior_type_probabilities : numpy.ndarray
+        Array with shape (n_individuals, n_types). Only returned if
+        ``return_posterior_type_probabilities=True``.
+
+    """
+    n_individuals = first_observations.shape[0]
+    n_types = loglikes["choice"].shape[1]
+
+    if log_type_probabilities is None:
+        log_type_probabilities = np.zeros((n_individuals, n_types))
+
+    contribs = np.empty(n_individuals)
+    weighted_loglikes = np.empty((n_individuals, n_types))
+
+    _compute_log_likelihoods_of_individuals(
+        loglikes["choice"],
+        loglikes["wage"],
+        first_observations,
+        log_type_probabilities,
+        return_posterior_type_probabilities,
+        contribs,
+        weighted_loglikes,
+    )
 
     contribs = np.clip(contribs, MIN_FLOAT, MAX_FLOAT)
 
-    return contribs, df, log_type_probabilities
+    if return_posterior_type_probabilities:
+        out = contribs, weighted_loglikes
+    else:
+        out = contribs
+
+    return out
+
+
+@nb.njit(parallel=True, nogil=True)
+def _compute_log_likelihoods_of_individuals(
+    choice_loglikes,
+    wage_loglikes,
+    first_observations,
+    log_type_probabilities,
+    compute_posterior_type_probabilities,
+    contribs,
+    weighted_loglikes,
+):
+    """Compute the log likelihoods of individuals in parallel.
+
+    The observations of each individual form one segment of the rows of the log
+    likelihood contributions. For each individual, the sum over the segment and the
+    log type probability are stored in ``weighted_loglikes`` before the log-sum-exp
+    over types is computed. If requested, ``weighted_loglikes`` is overwritten with the
+    posterior type probabilities.
+
+    Parameters
+    ----------
+    contribs : numpy.ndarray
+        Array with shape (n_individuals,) which is filled with the results.
+    weighted_loglikes : numpy.ndarray
+        Array with shape (n_individuals, n_types) which is used as scratch space or
+        filled with the posterior type probabilities.
+
+    """
+    n_observations, n_types = choice_loglikes.shape
+    n_individuals = first_observations.shape[0]
+
+    for i in nb.prange(n_individuals):
+        start = first_observations[i]
+        stop = first_observations[i + 1] if i + 1 < n_individuals else n_observations
+
+        for t in range(n_types):
+            weighted_loglikes[i, t] = 0.0
+        for row in range(start, stop):
+            for t in range(n_types):
+                weighted_loglikes[i, t] += (
+                    choice_loglikes[row, t] + wage_loglikes[row, t]
+                )
+
+        max_loglike = -np.inf
+        for t in range(n_types):
+            weighted_loglikes[i, t] += log_type_probabilities[i, t]
+            if weighted_loglikes[i, t] > max_loglike:
+                max_loglike = weighted_loglikes[i, t]
+
+        sum_exp = 0.0
+        for t in range(n_types):
+            sum_exp += np.exp(weighted_loglikes[i, t] - max_loglike)
+        contribs[i] = max_loglike + np.log(sum_exp)
+
+        if compute_posterior_type_probabilities:
+            for t in range(n_types):
+                weighted_loglikes[i, t] = np.exp(weighted_loglikes[i, t] - contribs[i])
 
 
-@split_and_combine_likelihood
 @parallelize_across_dense_dimensions
 def _compute_wage_and_choice_likelihood_contributions(
-    df, base_draws_est, wages, nonpecs, expected_value_functions, optim_paras, options,
+    observations,
+    base_draws_est,
+    updated_chols,
+    wages,
+    nonpecs,
+    expected_value_functions,
+    optim_paras,
+    options,
 ):
-    n_choices = len(optim_paras["choices"])
-    n_obs = df.shape[0]
+    """Compute the likelihood contributions of wages and choices of observations.
 
-    indices = df["index"].to_numpy()
+    The observations are processed in blocks of ``options["estimation_chunk_size"]``
+    observations. The draws of a block are gathered from ``base_draws_est``. The
+    conditional draws are created on the fly inside the kernel of the choice
+    probabilities and are never stored. Thus, the memory needed for draws is bounded by
+    the block size, especially if ``base_draws_est`` is memory-mapped, see
+    ``options["cache_directory"]``. ``None`` processes all observations at once.
 
-    wages_systematic = wages[indices]
-    log_wages_observed = df["log_wage"].to_numpy()
-    choices = df["choice"].to_numpy()
+    With ``options["precision"] = "float32"``, the base draws, the conditional draws and
+    the inputs of the choice probabilities are in single precision. Wages are still
+    evaluated in double precision.
 
-    draws, wage_loglikes = create_draws_and_log_prob_wages(
-        log_wages_observed,
-        wages_systematic,
-        base_draws_est,
-        choices,
-        optim_paras["shocks_cholesky"],
-        len(optim_paras["choices_w_wage"]),
-        optim_paras["meas_error"],
-        optim_paras["has_meas_error"],
-    )
+    Parameters
+    ----------
+    observations : dict
+        The arrays of the observations which belong to the dense index, see
+        :func:`_create_estimation_data`.
+    base_draws_est : numpy.ndarray
+        Array with shape (n_observations * n_types, n_draws, n_choices) containing
+        i.i.d. draws from standard normal distributions.
+    updated_chols : numpy.ndarray
+        Array with shape (n_wages + 1, n_choices, n_choices) containing the Cholesky
+        factors of the shocks conditional on the sector of the observed wage, see
+        :func:`~respy.conditional_draws.update_cholesky_factors`.
+
+    Returns
+    -------
+    choice_loglikes : numpy.ndarray
+        Array with shape (n_observations_in_group,) containing the clipped log
+        likelihood contributions of choices.
+    wage_loglikes : numpy.ndarray
+        Array with shape (n_observations_in_group,) containing the clipped log
+        likelihood contributions of wages.
+
+    """
+    dtype = np.dtype(options["precision"])
+    n_obs = observations["indices"].shape[0]
+    chunk_size = options["estimation_chunk_size"] or max(n_obs, 1)
 
-    draws = draws.reshape(n_obs, -1, n_choices)
+    indices = observations["indices"]
+    log_wages_observed = observations["log_wages"]
+    choices = observations["choices"]
+    draw_indices = observations["draw_indices"]
+
+    wages_systematic = wages[indices]
 
     # To get the continuation values, correctly index the expected value functions. This
     # is the same operation done in `_SingleDimStateSpace.get_continuation_values()`.
-    child_indices = df[[f"child_index_{c}" for c in optim_paras["choices"]]]
+    child_indices = observations["child_indices"]
     mask = child_indices != INDEXER_INVALID_INDEX
     valid_indices = np.where(mask, child_indices, 0)
     continuation_values = np.where(mask, expected_value_functions[valid_indices], 0)
 
-    choice_loglikes = _simulate_log_probability_of_individuals_observed_choice(
-        wages[indices],
-        nonpecs[indices],
-        continuation_values,
-        draws,
-        optim_paras["beta_delta"],
-        choices,
-        options["estimation_tau"],
-    )
+    n_wages = len(optim_paras["choices_w_wage"])
 
-    df["loglike_choice"] = np.clip(choice_loglikes, MIN_FLOAT, MAX_FLOAT)
-    df["loglike_wage"] = np.clip(wage_loglikes, MIN_FLOAT, MAX_FLOAT)
+    if draw_indices is None:
+        draw_indices = np.arange(n_obs)
 
-    return df
+    if options["estimation_target"] == "serial" or is_worker_thread():
+        kernel = _simulate_log_probability_of_individuals_observed_choice_serial
+    else:
+        kernel = _simulate_log_probability_of_individuals_observed_choice
+
+    wage_loglikes = np.empty(n_obs)
+    choice_loglikes = np.empty(n_obs)
+
+    for start in range(0, n_obs, chunk_size):
+        block = slice(start, start + chunk_size)
+        n_obs_in_block = min(chunk_size, n_obs - start)
+
+        with instrument("wage_likelihood", options, n_observations=n_obs_in_block):
+            (
+                updated_means,
+                wage_loglikes[block],
+                chol_indices,
+            ) = update_means_and_log_prob_wages(
+                log_wages_observed[block],
+                wages_systematic[block],
+                choices[block],
+                optim_paras["shocks_cholesky"],
+                n_wages,
+                optim_paras["meas_error"],
+            )
+
+        with instrument("choice_probabilities", options, n_observations=n_obs_in_block):
+            choice_loglikes[block] = kernel(
+                base_draws_est,
+                draw_indices[block],
+                updated_means,
+                updated_chols,
+                chol_indices,
+                MAX_LOG_FLOAT,
+                wages_systematic[block].astype(dtype, copy=False),
+                nonpecs[indices[block]].astype(dtype, copy=False),
+                continuation_values[block].astype(dtype, copy=False),
+                dtype.type(optim_paras["beta_delta"]),
+                choices[block],
+                options["estimation_tau"],
+            )
+
+    choice_loglikes = np.clip(choice_loglikes, MIN_FLOAT, MAX_FLOAT)
+    wage_loglikes = np.clip(wage_loglikes, MIN_FLOAT, MAX_FLOAT)
+
+    return choice_loglikes, wage_loglikes
 
 
 def _compute_log_type_probabilities(df, optim_paras, options):
@@ -351,17 +700,16 @@ def _logsumexp(x):
     return log_sum_exp
 
 
-@nb.guvectorize(
-    ["f8[:], f8[:], f8[:], f8[:, :], f8, i8, f8, f8[:]"],
-    "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), (), (), () -> ()",
-    nopython=True,
-    target="parallel",
-)
-def _simulate_log_probability_of_individuals_observed_choice(
+def _simulate_log_probability_of_individuals_observed_choice_kernel(
+    base_draws,
+    draw_index,
+    updated_mean,
+    updated_chols,
+    chol_index,
+    max_log_float,
     wages,
     nonpec,
     continuation_values,
-    draws,
     delta,
     choice,
     tau,
@@ -386,16 +734,46 @@ def _simulate_log_probability_of_individuals_observed_choice(
     consecutive `logsumexp` functions is included in `#278
     <https://github.com/OpenSourceEconomics/respy/pull/288>`_.
 
+    The shocks are drawn from the distribution conditional on the observed wage. Each
+    conditional draw is created on the fly from the base draws, the updated mean and
+    the updated Cholesky factor, see
+    :func:`~respy.conditional_draws.calculate_conditional_draw`, and immediately enters
+    the value functions. Thus, the conditional draws of all observations are never
+    stored. The base draws of the observation are read in place from all base draws
+    such that no gathered copy of the base draws is needed either.
+
+    The rewards and continuation values can be in single precision. Then, the
+    conditional draws and the value functions are computed in single precision whereas
+    the log probabilities are accumulated in double precision.
+
+    The function is compiled twice. The default version runs in parallel over
+    observations and the serial version is used if ``options["estimation_target"]`` is
+    ``"serial"``. As the result of each observation is computed by a single thread, both
+    versions yield the same results.
+
     Parameters
     ----------
+    base_draws : numpy.ndarray
+        Array with shape (n_rows, n_draws, n_choices) containing iid standard normal
+        draws of all observations.
+    draw_index : int
+        Row of ``base_draws`` which belongs to the observation.
+    updated_mean : numpy.ndarray
+        Array with shape (n_choices,) containing the mean of the shocks conditional on
+        the observed wage.
+    updated_chols : numpy.ndarray
+        Array with shape (n_wages + 1, n_choices, n_choices) containing the Cholesky
+        factors of the conditional covariances.
+    chol_index : int
+        Index of the relevant updated Cholesky factor.
+    max_log_float : float
+        Value at which numbers soon to be exponentiated are clipped.
     wages : numpy.ndarray
         Array with shape (n_choices,).
     nonpec : numpy.ndarray
         Array with shape (n_choices,).
     continuation_values : numpy.ndarray
         Array with shape (n_choices,)
-    draws : numpy.ndarray
-        Array with shape (n_draws, n_choices)
     delta : float
         Discount rate.
     choice : int
@@ -409,16 +787,28 @@ def _simulate_log_probability_of_individuals_observed_choice(
         Simulated Smoothed log probability of choice.
 
     """
-    n_draws, n_choices = draws.shape
+    _, n_draws, n_choices = base_draws.shape
+    n_wages = updated_chols.shape[0] - 1
+    updated_chol = updated_chols[chol_index]
+    observation_base_draws = base_draws[draw_index]
 
     smoothed_log_probabilities = np.empty(n_draws)
     smoothed_value_functions = np.empty(n_choices)
+    draw = np.empty_like(wages)
 
     for i in range(n_draws):
+        calculate_conditional_draw(
+            observation_base_draws[i],
+            updated_mean,
+            updated_chol,
+            n_wages,
+            max_log_float,
+            draw,
+        )
 
         for j in range(n_choices):
             value_function, _ = aggregate_keane_wolpin_utility(
-                wages[j], nonpec[j], continuation_values[j], draws[i, j], delta
+                wages[j], nonpec[j], continuation_values[j], draw[j], delta
             )
 
             smoothed_value_functions[j] = value_function / tau
@@ -432,6 +822,30 @@ def _simulate_log_probability_of_individuals_observed_choice(
     smoothed_log_probability[0] = smoothed_log_prob
 
 
+_CHOICE_PROBABILITY_SIGNATURES = [
+    "f8[:, :, :], i8, f8[:], f8[:, :, :], u2, f8, "
+    "f4[:], f4[:], f4[:], f4, i8, f8, f8[:]",
+    "f8[:, :, :], i8, f8[:], f8[:, :, :], u2, f8, "
+    "f8[:], f8[:], f8[:], f8, i8, f8, f8[:]",
+]
+_CHOICE_PROBABILITY_LAYOUT = (
+    "(n_rows, n_draws, n_choices), (), (n_choices), "
+    "(n_wages_plus_one, n_choices, n_choices), (), (), (n_choices), (n_choices), "
+    "(n_choices), (), (), () -> ()"
+)
+
+_simulate_log_probability_of_individuals_observed_choice = nb.guvectorize(
+    _CHOICE_PROBABILITY_SIGNATURES,
+    _CHOICE_PROBABILITY_LAYOUT,
+    nopython=True,
+    target="parallel",
+)(_simulate_log_probability_of_individuals_observed_choice_kernel)
+
+_simulate_log_probability_of_individuals_observed_choice_serial = nb.guvectorize(
+    _CHOICE_PROBABILITY_SIGNATURES, _CHOICE_PROBABILITY_LAYOUT, nopython=True
+)(_simulate_log_probability_of_individuals_observed_choice_kernel)
+
+
 def _process_estimation_data(df, state_space, optim_paras, options):
     """Process estimation data.
 
@@ -454,17 +868,12 @@ def _process_estimation_data(df, state_space, optim_paras, options):
 
     Returns
     -------
-    choices : numpy.ndarray
-        Array with shape (n_observations, n_types) where information is only repeated
-        over the second axis.
-    idx_indiv_first_obs : numpy.ndarray
-        Array with shape (n_individuals,) containing indices for the first observations
-        of each individual.
-    indices : numpy.ndarray
-        Array with shape (n_observations, n_types) containing indices for states which
-        correspond to observations.
-    log_wages_observed : numpy.ndarray
-        Array with shape (n_observations, n_types) containing clipped log wages.
+    df : pandas.DataFrame
+        The processed data with choices, log wages, the indices of the states and of
+        their child states.
+    estimation_data : dict
+        The arrays of the data which are needed to compute the likelihood contributions,
+        see :func:`_create_estimation_data`.
     type_covariates : numpy.ndarray
         Array with shape (n_individuals, n_type_covariates) containing covariates to
         predict probabilities for each type.
@@ -525,7 +934,89 @@ def _process_estimation_data(df, state_space, optim_paras, options):
     else:
         type_covariates = None
 
-    return df, type_covariates
+    estimation_data = _create_estimation_data(df, optim_paras)
+
+    return df, estimation_data, type_covariates
+
+
+def _create_estimation_data(df, optim_paras):
+    """Create the arrays of the data which are needed to compute the likelihood.
+
+    The data does not change between evaluations of the likelihood. Thus, the data is
+    split once into groups of observations which belong to the same dense index, i.e.,
+    the same combination of observables and type. If types are modeled, the
+    observations are repeated for each type.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The processed data, see :func:`_process_estimation_data`.
+    optim_paras : dict
+
+    Returns
+    -------
+    estimation_data : dict
+        Dictionary with the following keys.
+
+        - ``"n_observations"``: The number of observations.
+        - ``"first_observations"``: Array with shape (n_individuals,) containing the
+          positions of the first observation of each individual.
+        - ``"observations"``: Dictionary with the arrays of all observations or, if the
+          model has dense dimensions, a dictionary with dense indices as keys and the
+          arrays of the observations in the group as values. The arrays are
+          ``"indices"`` of the states, ``"child_indices"``, ``"choices"``,
+          ``"log_wages"``, ``"draw_indices"`` which are the rows of the base draws or
+          :data:`None` if rows of draws and observations coincide, and ``"rows"`` which
+          are the positions of the observations in the data. ``"type"`` is the type of
+          the group.
+
+    """
+    n_observations = df.shape[0]
+    n_types = optim_paras["n_types"]
+
+    arrays = {
+        "indices": df["index"].to_numpy(),
+        "child_indices": df[
+            [f"child_index_{c}" for c in optim_paras["choices"]]
+        ].to_numpy(),
+        "choices": df["choice"].to_numpy(),
+        "log_wages": df["log_wage"].to_numpy(),
+    }
+
+    dense_columns = create_dense_state_space_columns(optim_paras)
+    if dense_columns:
+        observables = list(optim_paras["observables"])
+        rows_of_groups = (
+            df.groupby(observables).indices
+            if observables
+            else {(): np.arange(n_observations)}
+        )
+        rows_of_groups = convert_dictionary_keys_to_dense_indices(rows_of_groups)
+
+        observations = {}
+        for observables_idx, rows in rows_of_groups.items():
+            for type_ in range(n_types):
+                dense_idx = (
+                    observables_idx + (type_,) if n_types >= 2 else observables_idx
+                )
+                observations[dense_idx] = {
+                    **{name: array[rows] for name, array in arrays.items()},
+                    # Draws are assigned to observations ordered like observation *
+                    # n_types to keep the results of the regression tests.
+                    "draw_indices": rows * n_types + type_,
+                    "rows": rows,
+                    "type": type_,
+                }
+    else:
+        observations = {**arrays, "draw_indices": None}
+
+    estimation_data = {
+        "n_observations": n_observations,
+        "first_observations": get_first_observations_of_individuals(df),
+        "observations": observations,
+    }
+
+    return estimation_data
 
 
 def _adjust_optim_paras_for_estimation(optim_paras, df):
@@ -560,8 +1051,18 @@ def _adjust_optim_paras_for_estimation(optim_paras, df):
     return optim_paras
 
 
-def _create_comparison_plot_data(df, log_type_probabilities, optim_paras):
+def _create_comparison_plot_data(df, loglikes, log_type_probabilities, optim_paras):
     """Create DataFrame for estimagic's comparison plot."""
+    df = pd.concat(
+        [
+            df.assign(
+                loglike_choice=loglikes["choice"][:, type_],
+                loglike_wage=loglikes["wage"][:, type_],
+            )
+            for type_ in range(optim_paras["n_types"])
+        ]
+    )
+
     # During the likelihood calculation, the log likelihood for missing wages is
     # substituted with 0. Remove these log likelihoods to get the correct picture.
     df = df.loc[df.log_wage.notna()]
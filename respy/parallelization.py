@@ -1,12 +1,14 @@
 """This module contains the code to control parallel execution."""
 import functools
+from concurrent.futures import ThreadPoolExecutor
 
-import joblib
 import numpy as np
 import pandas as pd
 
+from respy.config import WORKER_THREAD_NAME_PREFIX
 from respy.shared import convert_dictionary_keys_to_dense_indices
 from respy.shared import create_dense_state_space_columns
+from respy.shared import get_first_observations_of_individuals
 
 
 def parallelize_across_dense_dimensions(func=None, *, n_jobs=1):
@@ -25,22 +27,36 @@ def parallelize_across_dense_dimensions(func=None, *, n_jobs=1):
     across dense dimensions by patching the attribute access such that each sub state
     space can only access its attributes.
 
+    The number of jobs can be set when the decorator is applied and overridden with the
+    keyword argument ``n_jobs`` when the decorated function is called. The keyword is
+    consumed by the decorator and not passed to the function. With more than one job,
+    the calls for all dense indices are submitted at once to a persistent pool of
+    threads, see :func:`_get_thread_pool`. As threads share memory, the read-only
+    arrays of the state space are not pickled or copied.
+
     The decorator can be applied to functions without trailing parentheses. At the same
     time, the `*` prohibits to use the decorator with positional arguments.
 
     """
+    n_jobs_default = n_jobs
 
     def decorator_parallelize_across_dense_dimensions(func):
         @functools.wraps(func)
         def wrapper_parallelize_across_dense_dimensions(*args, **kwargs):
+            n_jobs = kwargs.pop("n_jobs", n_jobs_default)
             dense_indices = _infer_dense_indices_from_arguments(args, kwargs)
             if dense_indices:
                 args_, kwargs_ = _broadcast_arguments(args, kwargs, dense_indices)
 
-                out = joblib.Parallel(n_jobs=n_jobs)(
-                    joblib.delayed(func)(*args_[idx], **kwargs_[idx])
-                    for idx in dense_indices
-                )
+                if n_jobs == 1:
+                    out = [func(*args_[idx], **kwargs_[idx]) for idx in dense_indices]
+                else:
+                    pool = _get_thread_pool(n_jobs)
+                    futures = [
+                        pool.submit(func, *args_[idx], **kwargs_[idx])
+                        for idx in dense_indices
+                    ]
+                    out = [future.result() for future in futures]
 
                 # Re-order multiple return values from list of tuples to tuple of lists
                 # to tuple of dictionaries to set as state space attributes.
@@ -68,6 +84,25 @@ def parallelize_across_dense_dimensions(func=None, *, n_jobs=1):
         return decorator_parallelize_across_dense_dimensions
 
 
+@functools.lru_cache(maxsize=None)
+def _get_thread_pool(n_jobs):
+    """Get a persistent pool of threads.
+
+    The pool is created once per number of jobs and reused for all following calls such
+    that the costs of starting workers are only paid once per process.
+
+    The threads are named with :data:`respy.config.WORKER_THREAD_NAME_PREFIX`. Functions
+    which are executed by the workers, e.g.,
+    :func:`respy.shared.calculate_expected_value_functions`, use this information to
+    run Numba kernels serially. Otherwise, the workers would launch nested parallel
+    regions.
+
+    """
+    return ThreadPoolExecutor(
+        max_workers=n_jobs, thread_name_prefix=WORKER_THREAD_NAME_PREFIX
+    )
+
+
 def combine_and_split_interpolation(func):
     """Combine and split the information across sub state spaces.
 
@@ -139,48 +174,53 @@ def split_and_combine_df(func=None, *, remove_type=False):
         return decorator_split_and_combine_df
 
 
-def split_and_combine_likelihood(func):
-    """Split the likelihood calculation across sub state spaces and combine.
+def split_and_combine_agents(func):
+    """Split the simulation across blocks of individuals and combine.
+
+    With more than one job, the individuals are split into ``n_jobs`` blocks of
+    consecutive individuals. The rows of the data and of all arrays with one row per
+    observation are sliced accordingly and the blocks are submitted to the persistent
+    pool of threads, see :func:`_get_thread_pool`. The results are concatenated in the
+    original order. As randomness is fixed per observation before the data is split,
+    the result does not depend on the number of jobs.
 
-    If types are modeled, the data is duplicated for each type. Along with the data, the
-    shocks are split across the dense indices.
+    The number of jobs is passed with the keyword argument ``n_jobs`` which is consumed
+    by the decorator.
 
     """
 
     @functools.wraps(func)
-    def wrapper_distribute_and_combine_likelihood(
-        df, base_draws_est, *args, optim_paras, options
-    ):
-        dense_columns = create_dense_state_space_columns(optim_paras)
-        # Duplicate the DataFrame for each type.
-        if dense_columns:
-            n_obs = df.shape[0]
-            n_types = optim_paras["n_types"]
-
-            # Number each state to split the shocks later. This is necessary to keep the
-            # regression tests from failing.
-            df["__id"] = np.arange(n_obs)
-            # Each row of indices corresponds to a state whereas the columns refer to
-            # different types.
-            indices = np.arange(n_obs * n_types).reshape(n_obs, n_types)
-
-            df_ = pd.concat([df.copy().assign(type=i) for i in range(n_types)])
-            splitted_df = _split_dataframe(df_, dense_columns)
-
-            splitted_shocks = _split_shocks(
-                base_draws_est, splitted_df, indices, optim_paras
-            )
+    def wrapper_split_and_combine_agents(df, *args, n_jobs=1, **kwargs):
+        if n_jobs == 1:
+            out = func(df, *args, **kwargs)
         else:
-            splitted_df = df
-            splitted_shocks = base_draws_est
-
-        out = func(splitted_df, splitted_shocks, *args, optim_paras, options)
-
-        out = pd.concat(out.values()).sort_index() if isinstance(out, dict) else out
+            n_observations = df.shape[0]
+            first_observations = get_first_observations_of_individuals(df)
+            n_individuals = len(first_observations)
+            n_blocks = min(n_jobs, n_individuals)
+
+            block_starts = first_observations[
+                np.arange(n_blocks) * n_individuals // n_blocks
+            ]
+            block_stops = np.append(block_starts[1:], n_observations)
+
+            pool = _get_thread_pool(n_jobs)
+            futures = []
+            for start, stop in zip(block_starts, block_stops):
+                args_ = [
+                    arg[start:stop]
+                    if isinstance(arg, np.ndarray) and len(arg) == n_observations
+                    else arg
+                    for arg in args
+                ]
+                futures.append(
+                    pool.submit(func, df.iloc[start:stop], *args_, **kwargs)
+                )
+            out = pd.concat([future.result() for future in futures])
 
         return out
 
-    return wrapper_distribute_and_combine_likelihood
+    return wrapper_split_and_combine_agents
 
 
 def _infer_dense_indices_from_arguments(args, kwargs):
@@ -256,22 +296,3 @@ def _split_dataframe(df, dense_columns):
     groups = convert_dictionary_keys_to_dense_indices(groups)
 
     return groups
-
-
-def _split_shocks(base_draws_est, splitted_df, indices, optim_paras):
-    """Split the shocks.
-
-    Previously, shocks were assigned to observations which were ordered like observation
-    * n_types. Due to the changes to the dense dimensions, this might not be true
-    anymore. Thus, ensure the former ordering with the `__id` variable. This will be
-    removed with new regression tests.
-
-    """
-    splitted_shocks = {}
-    for dense_idx, sub_df in splitted_df.items():
-        type_ = dense_idx[-1] if optim_paras["n_types"] >= 2 else 0
-        sub_indices = sub_df.pop("__id").to_numpy()
-        shock_indices_for_group = indices[sub_indices][:, type_].reshape(-1)
-        splitted_shocks[dense_idx] = base_draws_est[shock_indices_for_group]
-
-    return splitted_shocks
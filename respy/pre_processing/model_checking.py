@@ -1,4 +1,6 @@
 """Everything related to validate the model."""
+from pathlib import Path
+
 import numpy as np
 
 
@@ -13,6 +15,8 @@ def validate_options(o):
             assert _is_nonnegative_integer(value)
 
     assert 0 < o["estimation_tau"]
+    assert _is_nonnegative_integer(o["ambiguity_max_iterations"])
+    assert 0 <= o["ambiguity_tolerance"]
     assert (
         _is_positive_nonzero_integer(o["interpolation_points"])
         or o["interpolation_points"] == -1
@@ -28,6 +32,16 @@ def validate_options(o):
         for key, val in o["inadmissible_states"].items()
     )
     assert o["monte_carlo_sequence"] in ["random", "halton", "sobol"]
+    assert _is_positive_nonzero_integer(o["n_jobs"])
+    assert isinstance(o["partial_resolve"], bool)
+    assert o["instrumentation"] is None or callable(o["instrumentation"])
+    assert o["memory_map_directory"] is None or Path(o["memory_map_directory"]).is_dir()
+    assert o["cache_directory"] is None or Path(o["cache_directory"]).is_dir()
+    assert o["estimation_chunk_size"] is None or _is_positive_nonzero_integer(
+        o["estimation_chunk_size"]
+    )
+    assert o["precision"] in ["float64", "float32"]
+    assert o["estimation_target"] in ["parallel", "serial"]
 
 
 def validate_params(params, optim_paras):
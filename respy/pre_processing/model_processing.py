@@ -105,8 +105,7 @@ def _create_internal_seeds_from_user_seeds(options):
     for seed, start, end in zip(
         seeds, [100, 10_000, 1_000_000], [1_000, 100_000, 10_000_000]
     ):
-        np.random.seed(options[seed])
-        seed_startup = np.random.randint(start, end)
+        seed_startup = np.random.RandomState(options[seed]).randint(start, end)
         options[f"{seed}_startup"] = itertools.count(seed_startup)
         seed_iteration = seed_startup + SEED_STARTUP_ITERATION_GAP
         options[f"{seed}_iteration"] = itertools.count(seed_iteration)
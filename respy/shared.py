@@ -4,14 +4,24 @@ This module should only import from other packages or modules of respy which als
 import from respy itself. This is to prevent circular imports.
 
 """
+import functools
+import os
+import tempfile
+import threading
+from pathlib import Path
+
 import chaospy as cp
 import numba as nb
 import numpy as np
 import pandas as pd
 
-from robupy.get_worst_case import get_worst_case_probs
+from respy.config import BASE_DRAWS_CACHE_SIZE
+from respy.config import DEFAULT_OPTIONS
+from respy.config import EMAX_DRAW_TILE_SIZE
+from respy.config import EMAX_STATE_TILE_SIZE
 from respy.config import MAX_LOG_FLOAT
 from respy.config import MIN_LOG_FLOAT
+from respy.config import WORKER_THREAD_NAME_PREFIX
 
 
 @nb.njit
@@ -52,7 +62,7 @@ def aggregate_keane_wolpin_utility(wage, nonpec, continuation_value, draw, delta
     return alternative_specific_value_function, flow_utility
 
 
-def create_base_draws(shape, seed, monte_carlo_sequence):
+def create_base_draws(shape, seed, monte_carlo_sequence, cache_directory=None):
     """Create a set of draws from the standard normal distribution.
 
     The draws are either drawn randomly or from quasi-random low-discrepancy sequences,
@@ -74,6 +84,13 @@ def create_base_draws(shape, seed, monte_carlo_sequence):
     draws are sampled here and transformed to the distribution specified by the
     parameters in :func:`transform_base_draws_with_cholesky_factor`.
 
+    The draws only depend on the shape, the seed and the sequence. Thus, the last
+    :data:`~respy.config.BASE_DRAWS_CACHE_SIZE` arrays are cached in memory and
+    returned again if the solution, simulation or criterion function is built
+    repeatedly. If ``cache_directory`` is a directory, the draws are also stored as
+    ``.npy`` files and loaded memory-mapped by later calls or other processes. The
+    returned array is shared between calls and must not be modified in-place.
+
     Parameters
     ----------
     shape : tuple(int)
@@ -82,6 +99,8 @@ def create_base_draws(shape, seed, monte_carlo_sequence):
         Seed to control randomness.
     monte_carlo_sequence : {"random", "halton", "sobol"}
         Name of the sequence.
+    cache_directory : str, pathlib.Path or None
+        Directory for the on-disk cache of draws. ``None`` disables the cache on disk.
 
     Returns
     -------
@@ -102,13 +121,51 @@ def create_base_draws(shape, seed, monte_carlo_sequence):
             Verlag New York.*
 
     """
+    shape = tuple(int(i) for i in shape)
+    cache_directory = None if cache_directory is None else str(cache_directory)
+
+    draws = _get_base_draws(shape, int(seed), monte_carlo_sequence, cache_directory)
+
+    return draws
+
+
+@functools.lru_cache(maxsize=BASE_DRAWS_CACHE_SIZE)
+def _get_base_draws(shape, seed, monte_carlo_sequence, cache_directory):
+    """Load the draws from the cache on disk or create them."""
+    if cache_directory is None:
+        draws = _create_base_draws(shape, seed, monte_carlo_sequence)
+    else:
+        dimensions = "x".join(str(i) for i in shape)
+        path = Path(
+            cache_directory, f"base_draws_{monte_carlo_sequence}_{seed}_{dimensions}.npy"
+        )
+        if not path.exists():
+            draws = _create_base_draws(shape, seed, monte_carlo_sequence)
+            # Write to a temporary file first such that other processes never read a
+            # partially written file.
+            with tempfile.NamedTemporaryFile(
+                dir=cache_directory, suffix=".npy", delete=False
+            ) as file:
+                np.save(file, draws)
+            os.replace(file.name, path)
+
+        # Copy-on-write keeps the array writeable without changing the file.
+        draws = np.load(path, mmap_mode="c")
+
+    return draws
+
+
+def _create_base_draws(shape, seed, monte_carlo_sequence):
+    """Create the draws, see :func:`create_base_draws`."""
     n_choices = shape[-1]
     n_points = np.prod(shape[:-1])
 
-    np.random.seed(seed)
+    # Use a local random number generator to leave the global state untouched. It yields
+    # the same draws as seeding the global generator.
+    random_state = np.random.RandomState(seed)
 
     if monte_carlo_sequence == "random":
-        draws = np.random.standard_normal(shape)
+        draws = random_state.standard_normal(shape)
 
     elif monte_carlo_sequence == "halton":
         distribution = cp.MvNormal(loc=np.zeros(n_choices), scale=np.eye(n_choices))
@@ -402,22 +459,25 @@ def create_state_space_columns(optim_paras):
     ) + create_dense_state_space_columns(optim_paras)
 
 
-@nb.guvectorize(
-    ["f8[:], f8[:], f8[:], f8[:, :], f8, f8, f8[:]"],
-    "(n_choices), (n_choices), (n_choices), (n_draws, n_choices), (), () -> ()",
-    nopython=True,
-    target="parallel",
-)
 def calculate_expected_value_functions(
-    wages, nonpecs, continuation_values, draws, delta, eta, expected_value_functions
+    wages,
+    nonpecs,
+    continuation_values,
+    draws,
+    delta,
+    eta,
+    max_iterations=DEFAULT_OPTIONS["ambiguity_max_iterations"],
+    tolerance=DEFAULT_OPTIONS["ambiguity_tolerance"],
+    precision=DEFAULT_OPTIONS["precision"],
+    state_indices=None,
 ):
     r"""Calculate the expected maximum of value functions for a set of unobservables.
 
     The function takes an agent and calculates the utility for each of the choices, the
     ex-post rewards, with multiple draws from the distribution of unobservables and adds
-    the discounted expected maximum utility under a worst case scenario of subsequent periods
-    resulting from choices. Averaging over all maximum utilities yields the expected maximum
-    utility of this state
+    the discounted expected maximum utility under a worst case scenario of subsequent
+    periods resulting from choices. Averaging over all maximum utilities yields the
+    expected maximum utility of this state
 
     The underlying process in this function is called `Monte Carlo integration`_. The
     goal is to approximate an integral by evaluating the integrand at randomly chosen
@@ -433,59 +493,386 @@ def calculate_expected_value_functions(
         \text{Flow Utility} = \text{Wage} * \epsilon + \text{Non-pecuniary}
         \text{Flow Utility} = 1 * \epsilon + \text{Non-pecuniary}
 
+    The computation is done by :func:`_calculate_expected_value_functions` which runs
+    in parallel over blocks of states. Each block receives its own slice of a scratch
+    array to store the maximum value function per draw of a tile of states so that no
+    memory is allocated per state. If the function is called by a worker thread which
+    already processes one of many dense sub state spaces, all states form one block and
+    are processed serially to avoid nested parallelism.
+
+    With ``precision="float32"``, rewards, continuation values, draws and the discount
+    factor are converted to single precision before they enter the kernel such that the
+    value functions are computed in single precision. The sums over draws are still
+    accumulated in double precision.
+
     Parameters
     ----------
     wages : numpy.ndarray
-        Array with shape (n_choices,) containing wages.
+        Array with shape (n_states, n_choices) containing wages.
     nonpecs : numpy.ndarray
-        Array with shape (n_choices,) containing non-pecuniary rewards.
+        Array with shape (n_states, n_choices) containing non-pecuniary rewards.
     continuation_values : numpy.ndarray
-        Array with shape (n_choices,) containing expected maximum utility for each
-        choice in the subsequent period.
+        Array with shape (n_states, n_choices) containing expected maximum utility for
+        each choice in the subsequent period.
     draws : numpy.ndarray
         Array with shape (n_draws, n_choices).
     delta : float
         The discount factor.
     eta: float
         The size of the ambiguity set.
+    max_iterations : int
+        Maximum number of iterations to find the worst-case distribution of a state.
+    tolerance : float
+        Tolerance for the divergence of the worst-case distribution.
+    precision : {"float64", "float32"}
+        Precision of the value functions.
+    state_indices : numpy.ndarray, default None
+        Array with shape (n_selected_states,) containing the indices of the states for
+        which the expected value functions are computed. The rewards and continuation
+        values of these states are read in place instead of copying a subset of the
+        arrays. ``None`` selects all states.
 
     Returns
     -------
-    expected_value_functions : float
-        Expected maximum utility of an agent.
+    expected_value_functions : numpy.ndarray
+        Array with shape (n_states,) or (n_selected_states,) containing the expected
+        maximum utility of each (selected) state.
 
     .. _Monte Carlo integration:
         https://en.wikipedia.org/wiki/Monte_Carlo_integration
 
     """
-    n_draws, n_choices = draws.shape
-    v = np.repeat(np.nan, n_draws)
+    dtype = np.dtype(precision)
+    wages, nonpecs, continuation_values, draws = (
+        np.asarray(array, dtype=dtype)
+        for array in (wages, nonpecs, continuation_values, draws)
+    )
+    delta = dtype.type(delta)
+
+    if state_indices is None:
+        state_indices = np.arange(wages.shape[0])
+
+    n_states = state_indices.shape[0]
+    n_draws = draws.shape[0]
+
+    if is_worker_thread():
+        n_blocks = 1
+        kernel = _calculate_expected_value_functions_serial
+    else:
+        # Use one block of states per thread, but never more blocks than states.
+        n_blocks = max(min(nb.config.NUMBA_NUM_THREADS, n_states), 1)
+        kernel = _calculate_expected_value_functions
+
+    max_value_functions = np.empty((n_blocks, EMAX_STATE_TILE_SIZE, n_draws))
+    expected_value_functions = np.empty(n_states)
+
+    kernel(
+        wages,
+        nonpecs,
+        continuation_values,
+        np.ascontiguousarray(draws.T),
+        delta,
+        eta,
+        max_iterations,
+        tolerance,
+        state_indices,
+        max_value_functions,
+        expected_value_functions,
+    )
+
+    return expected_value_functions
+
+
+@nb.njit(parallel=True, nogil=True)
+def _calculate_expected_value_functions(
+    wages,
+    nonpecs,
+    continuation_values,
+    draws,
+    delta,
+    eta,
+    max_iterations,
+    tolerance,
+    state_indices,
+    max_value_functions,
+    expected_value_functions,
+):
+    """Calculate the expected value functions for blocks of states in parallel.
+
+    Each block of states is processed in tiles of ``EMAX_STATE_TILE_SIZE`` states. A
+    tile of states is evaluated against tiles of ``EMAX_DRAW_TILE_SIZE`` draws such that
+    the tile of draws stays in the cache while it is used for all states of the tile.
+    The draws are transposed so that the innermost loop runs over contiguous draws of
+    one choice and the value functions ``wage * draw + nonpec + delta * cv`` can be
+    vectorized. The maximum over choices is reduced per draw in the scratch array.
+
+    The maximum value function of each draw is kept until all draws of a state are
+    processed because it is needed if the expected value function is computed under
+    ambiguity, i.e., ``eta > 0``. Otherwise, the maximum value functions are averaged.
+
+    Under ambiguity, the states of a block are processed in order and the multiplier of
+    the worst-case distribution of the previous state is the starting value for the
+    next state. Neighbouring states have similar value functions which is why the
+    solver usually needs only a few iterations.
+
+    Parameters
+    ----------
+    draws : numpy.ndarray
+        Array with shape (n_choices, n_draws).
+    state_indices : numpy.ndarray
+        Array with shape (n_selected_states,) containing the indices of the states in
+        ``wages``, ``nonpecs`` and ``continuation_values`` which are processed.
+    max_value_functions : numpy.ndarray
+        Scratch array with shape (n_blocks, n_states_in_tile, n_draws). Each block of
+        states uses one slice to store the maximum value function per draw of a tile of
+        states.
+    expected_value_functions : numpy.ndarray
+        Array with shape (n_selected_states,) which is filled with the results.
+
+    """
+    n_states = state_indices.shape[0]
+    n_choices = wages.shape[1]
+    n_draws = draws.shape[1]
+    n_blocks, n_states_in_tile, _ = max_value_functions.shape
+
+    for block in nb.prange(n_blocks):
+        start = block * n_states // n_blocks
+        stop = (block + 1) * n_states // n_blocks
+        block_max_value_functions = max_value_functions[block]
+        multiplier = 0.0
+
+        for tile_start in range(start, stop, n_states_in_tile):
+            tile_stop = min(tile_start + n_states_in_tile, stop)
+            block_max_value_functions[:] = 0.0
+
+            for draw_start in range(0, n_draws, EMAX_DRAW_TILE_SIZE):
+                draw_stop = min(draw_start + EMAX_DRAW_TILE_SIZE, n_draws)
+
+                for position in range(tile_start, tile_stop):
+                    state = state_indices[position]
+                    state_max_value_functions = block_max_value_functions[
+                        position - tile_start
+                    ]
+
+                    for j in range(n_choices):
+                        wage = wages[state, j]
+                        nonpec = nonpecs[state, j]
+                        discounted_continuation_value = (
+                            delta * continuation_values[state, j]
+                        )
+
+                        # Same order of operations as aggregate_keane_wolpin_utility.
+                        for i in range(draw_start, draw_stop):
+                            value_function = (
+                                wage * draws[j, i]
+                                + nonpec
+                                + discounted_continuation_value
+                            )
+                            if value_function > state_max_value_functions[i]:
+                                state_max_value_functions[i] = value_function
+
+            for position in range(tile_start, tile_stop):
+                state_max_value_functions = block_max_value_functions[
+                    position - tile_start
+                ]
+
+                if eta == 0:
+                    sum_max_value_functions = 0.0
+                    for i in range(n_draws):
+                        sum_max_value_functions += state_max_value_functions[i]
+                    expected_value_functions[position] = (
+                        sum_max_value_functions / n_draws
+                    )
+                else:
+                    (
+                        expected_value_functions[position],
+                        multiplier,
+                    ) = _calculate_worst_case_expected_value(
+                        state_max_value_functions,
+                        eta,
+                        multiplier,
+                        max_iterations,
+                        tolerance,
+                    )
+
+
+_calculate_expected_value_functions_serial = nb.njit(nogil=True)(
+    _calculate_expected_value_functions.py_func
+)
+
 
-    expected_value_functions[0] = 0
+def is_worker_thread():
+    """Check whether the current thread is a worker of respy's pool of threads."""
+    return threading.current_thread().name.startswith(WORKER_THREAD_NAME_PREFIX)
 
+
+@nb.njit(nogil=True)
+def _calculate_worst_case_expected_value(
+    values, eta, multiplier, max_iterations, tolerance
+):
+    r"""Calculate the worst-case expectation of values in an ambiguity set.
+
+    The ambiguity set contains all distributions over the draws whose Kullback-Leibler
+    divergence to the uniform distribution of the Monte Carlo draws is at most
+    :math:`\eta`. The worst-case distribution is an exponential tilting of the uniform
+    distribution,
+
+    .. math::
+
+        p_i(\theta) = \frac{e^{-\theta (v_i - \min v)}}{
+            \sum_j e^{-\theta (v_j - \min v)}
+        },
+
+    where the multiplier :math:`\theta \geq 0` of the dual problem is chosen such
+    that the divergence :math:`D(\theta)` equals :math:`\eta`. The divergence is
+    increasing in :math:`\theta` with :math:`D'(\theta) = \theta
+    \text{Var}_{p(\theta)}(v)` which allows to find the root with Newton steps. Steps
+    which leave the bracket of the root are replaced by bisection steps or, as long as
+    no upper bound is known, by doubling the multiplier.
+
+    If :math:`\eta` exceeds the divergence of the point mass on the minimum, the
+    worst case is the minimum itself.
+
+    The probabilities are never stored. Instead, the moments of the tilted distribution
+    are accumulated in :func:`_calculate_tilted_moments` with a pass over ``values``.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Array with shape (n_draws,) containing the maximum value function of each draw.
+    eta : float
+        The size of the ambiguity set.
+    multiplier : float
+        Starting value for the multiplier. Non-positive values are replaced with a
+        guess based on the mean distance of the values to their minimum.
+    max_iterations : int
+        Maximum number of iterations.
+    tolerance : float
+        The iteration stops if the divergence deviates less than the tolerance from
+        ``eta``.
+
+    Returns
+    -------
+    worst_case_expected_value : float
+    multiplier : float
+        The multiplier of the worst-case distribution which serves as the starting
+        value for the next state.
+
+    """
+    n_draws = values.shape[0]
+
+    min_value = values[0]
+    for i in range(1, n_draws):
+        if values[i] < min_value:
+            min_value = values[i]
+
+    n_minima = 0
+    sum_distances = 0.0
     for i in range(n_draws):
+        distance = values[i] - min_value
+        sum_distances += distance
+        if distance == 0:
+            n_minima += 1
+
+    # The divergence of the point mass on the minima is the largest attainable one.
+    if eta >= np.log(n_draws / n_minima):
+        return min_value, multiplier
+
+    if multiplier <= 0:
+        multiplier = n_draws / sum_distances
+
+    lower = 0.0
+    upper = np.inf
+
+    for _ in range(max_iterations):
+        divergence, expected_distance, variance = _calculate_tilted_moments(
+            values, min_value, multiplier
+        )
+        residual = divergence - eta
+
+        if abs(residual) <= tolerance:
+            break
+        elif residual < 0:
+            lower = multiplier
+        else:
+            upper = multiplier
 
-        max_value_functions = 0
+        slope = multiplier * variance
+        candidate = multiplier - residual / slope if slope > 0 else -1.0
 
-        for j in range(n_choices):
-            value_function, _ = aggregate_keane_wolpin_utility(
-                wages[j], nonpecs[j], continuation_values[j], draws[i, j], delta
-            )
+        if lower < candidate < upper:
+            multiplier = candidate
+        elif upper == np.inf:
+            multiplier *= 2
+        else:
+            multiplier = (lower + upper) / 2
+
+    else:
+        _, expected_distance, _ = _calculate_tilted_moments(
+            values, min_value, multiplier
+        )
+
+    return min_value + expected_distance, multiplier
+
+
+@nb.njit(nogil=True)
+def _calculate_tilted_moments(values, min_value, multiplier):
+    """Calculate the moments of the tilted distribution.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Array with shape (n_draws,).
+    min_value : float
+        Minimum of ``values``. Subtracting it ensures that all exponents are
+        non-positive and that the normalizing constant is at least one.
+    multiplier : float
+        The multiplier of the tilting.
 
-            if value_function > max_value_functions:
-                max_value_functions = value_function
+    Returns
+    -------
+    divergence : float
+        Kullback-Leibler divergence between the tilted and the uniform distribution.
+    expected_distance : float
+        Expectation of ``values - min_value`` under the tilted distribution.
+    variance : float
+        Variance of ``values`` under the tilted distribution.
+
+    """
+    n_draws = values.shape[0]
+
+    sum_weights = 0.0
+    sum_weighted_distances = 0.0
+    sum_weighted_squared_distances = 0.0
+    for i in range(n_draws):
+        distance = values[i] - min_value
+        weight = np.exp(-multiplier * distance)
+        sum_weights += weight
+        sum_weighted_distances += weight * distance
+        sum_weighted_squared_distances += weight * distance ** 2
+
+    expected_distance = sum_weighted_distances / sum_weights
+    variance = max(
+        sum_weighted_squared_distances / sum_weights - expected_distance ** 2, 0.0
+    )
+    divergence = np.log(n_draws) - multiplier * expected_distance - np.log(sum_weights)
+
+    return divergence, expected_distance, variance
 
-        v[i] = max_value_functions
 
+def get_first_observations_of_individuals(df):
+    """Get the positions of the first observation of each individual.
 
-    q = np.repeat(1.0 / n_draws, n_draws)
-    p = get_worst_case_probs(v, q, eta, is_cost=False)
+    The observations of an individual have to be stored consecutively in ``df`` which
+    is true for data sorted by identifier and period.
 
-    emax = 0
-    for i in range(len(v)):
-        emax += v[i] * p[i]
+    """
+    identifiers = df.index.get_level_values("identifier").to_numpy()
+    first_observations = np.flatnonzero(
+        np.diff(identifiers, prepend=identifiers[0] - 1)
+    )
 
-    expected_value_functions[0] = emax
+    return first_observations
 
 
 def convert_dictionary_keys_to_dense_indices(dictionary):
@@ -2,21 +2,26 @@
 import functools
 import warnings
 
+import numba as nb
 import numpy as np
 import pandas as pd
 from scipy.special import softmax
 
 from respy.config import COVARIATES_DOT_PRODUCT_DTYPE
+from respy.config import INDEXER_DTYPE
 from respy.config import INDEXER_INVALID_INDEX
-from respy.parallelization import parallelize_across_dense_dimensions
-from respy.parallelization import split_and_combine_df
+from respy.instrumentation import instrument
+from respy.parallelization import split_and_combine_agents
 from respy.pre_processing.model_processing import process_params_and_options
-from respy.shared import calculate_value_functions_and_flow_utilities
+from respy.shared import aggregate_keane_wolpin_utility
 from respy.shared import compute_covariates
 from respy.shared import create_base_draws
 from respy.shared import create_core_state_space_columns
+from respy.shared import create_dense_state_space_columns
 from respy.shared import create_state_space_columns
 from respy.shared import downcast_to_smallest_dtype
+from respy.shared import get_first_observations_of_individuals
+from respy.shared import is_worker_thread
 from respy.shared import rename_labels_from_internal
 from respy.shared import rename_labels_to_internal
 from respy.shared import transform_base_draws_with_cholesky_factor
@@ -29,6 +34,9 @@ def get_simulate_func(
     method="n_step_ahead_with_sampling",
     df=None,
     n_simulation_periods=None,
+    chunk_size=None,
+    columns=None,
+    n_jobs=None,
 ):
     """Get the simulation function.
 
@@ -51,6 +59,20 @@ def get_simulate_func(
         Simulate data for a number of periods. This options does not affect
         ``options["n_periods"]`` which controls the number of periods for which decision
         rules are computed.
+    chunk_size : int or None
+        If an integer is passed, the simulation function returns a generator which
+        yields DataFrames with the simulated data of ``chunk_size`` individuals. Thus,
+        the simulated data never has to fit into memory at once and can be written to
+        disk chunk by chunk. The simulated data is the same as without chunks, but the
+        dtypes of the columns are downcast per chunk.
+    columns : list or None
+        Labels of the columns of the simulated data, e.g., ``["Choice", "Wage"]``. Other
+        columns like the value functions which are mostly used for debugging are not
+        stored. ``None`` keeps all columns.
+    n_jobs : int or None
+        Number of threads which simulate blocks of individuals concurrently. The
+        simulated data does not depend on the number of jobs. ``None`` uses
+        ``options["n_jobs"]``.
 
     Returns
     -------
@@ -60,6 +82,12 @@ def get_simulate_func(
     """
     optim_paras, options = process_params_and_options(params, options)
 
+    if chunk_size is not None and not (isinstance(chunk_size, int) and chunk_size > 0):
+        raise ValueError("'chunk_size' must be a positive integer or None.")
+    n_jobs = options["n_jobs"] if n_jobs is None else n_jobs
+    if not (isinstance(n_jobs, int) and n_jobs > 0):
+        raise ValueError("'n_jobs' must be a positive integer or None.")
+
     n_simulation_periods, options = _harmonize_simulation_arguments(
         method, df, n_simulation_periods, options
     )
@@ -72,10 +100,16 @@ def get_simulate_func(
 
     shape = (df.shape[0], len(optim_paras["choices"]))
     base_draws_sim = create_base_draws(
-        shape, next(options["simulation_seed_startup"]), "random"
+        shape,
+        next(options["simulation_seed_startup"]),
+        "random",
+        options["cache_directory"],
     )
     base_draws_wage = create_base_draws(
-        shape, next(options["simulation_seed_startup"]), "random"
+        shape,
+        next(options["simulation_seed_startup"]),
+        "random",
+        options["cache_directory"],
     )
 
     simulate_function = functools.partial(
@@ -85,12 +119,25 @@ def get_simulate_func(
         df=df,
         solve=solve,
         options=options,
+        chunk_size=chunk_size,
+        columns=columns,
+        n_jobs=n_jobs,
     )
 
     return simulate_function
 
 
-def simulate(params, base_draws_sim, base_draws_wage, df, solve, options):
+def simulate(
+    params,
+    base_draws_sim,
+    base_draws_wage,
+    df,
+    solve,
+    options,
+    chunk_size=None,
+    columns=None,
+    n_jobs=1,
+):
     """Perform a simulation.
 
     This function performs one of three possible simulation exercises. The type of the
@@ -134,11 +181,19 @@ def simulate(params, base_draws_sim, base_draws_wage, df, solve, options):
         Function which creates the solution of the model with new parameters.
     options : dict
         Contains model options.
+    chunk_size : int or None
+        Number of individuals which are simulated at once. If ``None``, all individuals
+        are simulated at once and a DataFrame is returned.
+    columns : list or None
+        Labels of the columns of the simulated data. ``None`` keeps all columns.
+    n_jobs : int
+        Number of threads which simulate blocks of individuals concurrently.
 
     Returns
     -------
-    simulated_data : pandas.DataFrame
-        DataFrame of simulated individuals.
+    simulated_data : pandas.DataFrame or generator
+        DataFrame of simulated individuals or, if ``chunk_size`` is an integer, a
+        generator which yields DataFrames of chunks of simulated individuals.
 
     """
     # Copy DataFrame so that the DataFrame attached to :func:`simulate` is not altered.
@@ -148,54 +203,117 @@ def simulate(params, base_draws_sim, base_draws_wage, df, solve, options):
 
     state_space = solve(params)
 
-    # Prepare simulation.
-    n_simulation_periods = int(df.index.get_level_values("period").max() + 1)
-
+    # Characteristics are sampled for all individuals at once such that the simulated
+    # data does not depend on the chunk size.
     df = _extend_data_with_sampled_characteristics(df, optim_paras, options)
 
-    # Prepare shocks and store them in the pandas.DataFrame.
+    core_columns = create_core_state_space_columns(optim_paras)
+    is_n_step_ahead = df[core_columns].isna().to_numpy().any()
+
+    if chunk_size is None:
+        simulated_data = _simulate_chunk(
+            df,
+            base_draws_sim,
+            base_draws_wage,
+            state_space,
+            is_n_step_ahead,
+            optim_paras,
+            options,
+            columns,
+            n_jobs,
+        )
+    else:
+        simulated_data = _generate_chunks(
+            df,
+            base_draws_sim,
+            base_draws_wage,
+            state_space,
+            is_n_step_ahead,
+            optim_paras,
+            options,
+            chunk_size,
+            columns,
+            n_jobs,
+        )
+
+    return simulated_data
+
+
+def _generate_chunks(
+    df,
+    base_draws_sim,
+    base_draws_wage,
+    state_space,
+    is_n_step_ahead,
+    optim_paras,
+    options,
+    chunk_size,
+    columns,
+    n_jobs,
+):
+    """Generate the simulated data in chunks of individuals.
+
+    The observations of an individual are stored consecutively. Thus, chunks are
+    positional slices of the data and the draws which start at the first observation of
+    every ``chunk_size``-th individual.
+
+    """
+    first_observations = get_first_observations_of_individuals(df)
+    chunk_starts = np.append(first_observations[::chunk_size], df.shape[0])
+
+    for start, stop in zip(chunk_starts[:-1], chunk_starts[1:]):
+        yield _simulate_chunk(
+            df.iloc[start:stop],
+            base_draws_sim[start:stop],
+            base_draws_wage[start:stop],
+            state_space,
+            is_n_step_ahead,
+            optim_paras,
+            options,
+            columns,
+            n_jobs,
+        )
+
+
+def _simulate_chunk(
+    df,
+    base_draws_sim,
+    base_draws_wage,
+    state_space,
+    is_n_step_ahead,
+    optim_paras,
+    options,
+    columns,
+    n_jobs,
+):
+    """Simulate a chunk of individuals and process the simulated data."""
     n_wages = len(optim_paras["choices_w_wage"])
     base_draws_sim_transformed = transform_base_draws_with_cholesky_factor(
         base_draws_sim, optim_paras["shocks_cholesky"], n_wages
     )
     base_draws_wage_transformed = np.exp(base_draws_wage * optim_paras["meas_error"])
-    for i, choice in enumerate(optim_paras["choices"]):
-        df[f"shock_reward_{choice}"] = base_draws_sim_transformed[:, i]
-        df[f"meas_error_wage_{choice}"] = base_draws_wage_transformed[:, i]
 
-    core_columns = create_core_state_space_columns(optim_paras)
-    is_n_step_ahead = np.any(df[core_columns].isna())
-
-    data = []
-    for period in range(n_simulation_periods):
-
-        # If it is a one-step-ahead simulation, we pick rows from the panel data. For
-        # n-step-ahead simulation, `df` always contains only data of the current period.
-        current_df = df.query("period == @period").copy()
-        wages = state_space.get_attribute_from_period("wages", period)
-        nonpecs = state_space.get_attribute_from_period("nonpecs", period)
-        continuation_values = state_space.get_continuation_values(period=period)
-        is_inadmissible = state_space.get_attribute_from_period(
-            "is_inadmissible", period
-        )
+    internal_columns = (
+        None if columns is None else [rename_labels_to_internal(c) for c in columns]
+    )
 
-        current_df_extended = _simulate_single_period(
-            current_df,
-            state_space.indexer[period],
-            wages,
-            nonpecs,
-            continuation_values,
-            is_inadmissible,
-            optim_paras=optim_paras,
+    with instrument(
+        "simulate_agents",
+        options,
+        n_observations=df.shape[0],
+    ):
+        df = _simulate_agents(
+            df,
+            state_space,
+            base_draws_sim_transformed,
+            base_draws_wage_transformed,
+            is_n_step_ahead,
+            optim_paras,
+            internal_columns,
+            n_jobs=n_jobs,
         )
 
-        data.append(current_df_extended)
-
-        if is_n_step_ahead and period != n_simulation_periods - 1:
-            next_df = _apply_law_of_motion(current_df_extended, optim_paras)
-            df = df.fillna(next_df)
-
-    simulated_data = _process_simulation_output(data, optim_paras)
+    simulated_data = _process_simulation_output(df, optim_paras)
 
     return simulated_data
 
@@ -272,72 +390,325 @@ def _extend_data_with_sampled_characteristics(df, optim_paras, options):
     return df
 
 
-@split_and_combine_df
-@parallelize_across_dense_dimensions
-def _simulate_single_period(
-    df, indexer, wages, nonpecs, continuation_values, is_inadmissible, optim_paras
+@split_and_combine_agents
+def _simulate_agents(
+    df, state_space, draws_shock, draws_wage, is_n_step_ahead, optim_paras, columns=None
 ):
-    """Simulate individuals in a single period.
+    """Simulate individuals in all periods.
+
+    The function performs the following steps:
+
+    - Convert the states of individuals and the attributes of the state space to
+      arrays.
+    - Map individuals to the states in the model, simulate choices and wages, and apply
+      the law of motion for all individuals and periods at once with
+      :func:`_simulate_agents_kernel`.
+    - Store the results in a single :class:`pandas.DataFrame` and return it.
 
-    The function performs the following sets:
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        DataFrame sorted by identifier and period with the states of individuals. For
+        n-step-ahead simulations, only the states in the first period are available and
+        every individual has an observation in every period.
+    state_space : :class:`~respy.state_space._BaseStateSpace`
+        The solved state space.
+    draws_shock : numpy.ndarray
+        Array with shape (n_observations, n_choices) containing the shocks.
+    draws_wage : numpy.ndarray
+        Array with shape (n_observations, n_choices) containing the measurement errors.
+    is_n_step_ahead : bool
+        Indicator for whether the states after the first period are computed with the
+        law of motion.
+    optim_paras : dict
+    columns : list or None
+        Internal names of the columns which are stored. ``None`` stores all columns.
 
-    - Map individuals in one period to the states in the model.
-    - Simulate choices and wages for those individuals.
-    - Store additional information in a :class:`pandas.DataFrame` and return it.
+    Returns
+    -------
+    df : pandas.DataFrame
+        DataFrame with the simulated information of individuals.
 
     """
-    n_wages = len(optim_paras["choices_w_wage"])
+    core_columns = create_core_state_space_columns(optim_paras)
+    dense_columns = create_dense_state_space_columns(optim_paras)
+    n_observations = df.shape[0]
+    n_choices = len(optim_paras["choices"])
+
+    # Missing states in later periods of n-step-ahead simulations are replaced with the
+    # law of motion. Set them to an invalid value in the meantime.
+    states = (
+        df[core_columns].fillna(-1).to_numpy(dtype=np.int64).reshape(n_observations, -1)
+    )
 
-    # Get indices which connect states in the state space and simulated agents. Subtract
-    # the minimum of indices (excluding invalid indices) because wages, etc. contain
-    # only wages in this period and normal indices select rows from all wages.
-    columns = create_core_state_space_columns(optim_paras)
-    indices = indexer[tuple(df[col].astype("int64") for col in columns)]
-    period_indices = indices - np.min(indexer[indexer != INDEXER_INVALID_INDEX])
-
-    try:
-        wages = wages[period_indices]
-        nonpecs = nonpecs[period_indices]
-        continuation_values = continuation_values[period_indices]
-        is_inadmissible = is_inadmissible[period_indices]
-    except IndexError as e:
+    dense_keys = (
+        np.array(list(state_space.sub_state_spaces))
+        if hasattr(state_space, "sub_state_spaces")
+        else np.zeros((1, 0))
+    )
+    dense_values = df[dense_columns].to_numpy(dtype=np.float64)
+    dense_codes = np.full(n_observations, -1)
+    for code, dense_key in enumerate(dense_keys):
+        dense_codes[(dense_values == dense_key).all(axis=1)] = code
+
+    agent_starts = np.append(get_first_observations_of_individuals(df), n_observations)
+    periods = df.index.get_level_values("period").to_numpy(dtype=np.int64)
+
+    flat_indexer, indexer_offsets, indexer_shapes = _flatten_indexer(
+        state_space.indexer
+    )
+
+    state_indices = np.full(n_observations, INDEXER_INVALID_INDEX, dtype=INDEXER_DTYPE)
+    choices = np.full(n_observations, -1)
+    wage = np.full(n_observations, np.nan)
+    wages = np.empty((n_observations, n_choices))
+    nonpecs = np.empty((n_observations, n_choices))
+    flow_utilities = np.empty((n_observations, n_choices))
+    value_functions = np.empty((n_observations, n_choices))
+    continuation_values = np.empty((n_observations, n_choices))
+
+    # Blocks of individuals which are simulated by worker threads are processed serially
+    # to avoid nested parallelism.
+    kernel = (
+        _simulate_agents_kernel_serial
+        if is_worker_thread()
+        else _simulate_agents_kernel
+    )
+    kernel(
+        states,
+        dense_codes,
+        periods,
+        agent_starts,
+        is_n_step_ahead,
+        flat_indexer,
+        indexer_offsets,
+        indexer_shapes,
+        _stack_attribute_of_sub_state_spaces(state_space, "wages"),
+        _stack_attribute_of_sub_state_spaces(state_space, "nonpecs"),
+        _stack_attribute_of_sub_state_spaces(state_space, "expected_value_functions"),
+        state_space.indices_of_child_states,
+        state_space.is_inadmissible,
+        draws_shock,
+        draws_wage,
+        len(optim_paras["choices_w_wage"]),
+        len(optim_paras["choices_w_exp"]),
+        optim_paras["beta_delta"],
+        state_indices,
+        choices,
+        wage,
+        wages,
+        nonpecs,
+        flow_utilities,
+        value_functions,
+        continuation_values,
+    )
+
+    if (state_indices == INDEXER_INVALID_INDEX).any():
         raise Exception(
             "Simulated individuals could not be mapped to their corresponding states in"
             " the state space. This might be caused by a mismatch between "
             "option['core_state_space_filters'] and the initial conditions."
-        ) from e
+        )
 
-    draws_shock = df[[f"shock_reward_{c}" for c in optim_paras["choices"]]].to_numpy()
-    draws_wage = df[[f"meas_error_wage_{c}" for c in optim_paras["choices"]]].to_numpy()
+    # Store necessary information and information for debugging, etc..
+    data = {}
+    for i, column in enumerate(core_columns):
+        data[column] = states[:, i]
+    for i, column in enumerate(dense_columns):
+        data[column] = dense_keys[dense_codes, i]
+    for i, choice in enumerate(optim_paras["choices"]):
+        data[f"shock_reward_{choice}"] = draws_shock[:, i]
+        data[f"meas_error_wage_{choice}"] = draws_wage[:, i]
+    data["choice"] = choices
+    data["wage"] = wage
+    data["discount_rate"] = optim_paras["delta"]
+    data["present_bias"] = optim_paras["beta"]
+    for i, choice in enumerate(optim_paras["choices"]):
+        data[f"nonpecuniary_reward_{choice}"] = nonpecs[:, i]
+        data[f"wage_{choice}"] = wages[:, i]
+        data[f"flow_utility_{choice}"] = flow_utilities[:, i]
+        data[f"value_function_{choice}"] = value_functions[:, i]
+        data[f"continuation_value_{choice}"] = continuation_values[:, i]
 
-    value_functions, flow_utilities = calculate_value_functions_and_flow_utilities(
-        wages, nonpecs, continuation_values, draws_shock, optim_paras["beta_delta"],
-    )
+    if columns is not None:
+        unknown_columns = set(columns) - set(data)
+        if unknown_columns:
+            raise ValueError(
+                f"The simulated data has no columns {sorted(unknown_columns)}."
+            )
+        data = {column: data[column] for column in columns}
 
-    # We need to ensure that no individual chooses an inadmissible state. Thus, set
-    # value functions to NaN. This cannot be done in `aggregate_keane_wolpin_utility` as
-    # the interpolation requires a mild penalty.
-    value_functions = np.where(is_inadmissible, np.nan, value_functions)
+    return pd.DataFrame(data, index=df.index)
 
-    choice = np.nanargmax(value_functions, axis=1)
 
-    wages = wages * draws_shock * draws_wage
-    wages[:, n_wages:] = np.nan
-    wage = np.choose(choice, wages.T)
+def _flatten_indexer(indexer):
+    """Flatten the sub indexers of all periods into one array.
 
-    # Store necessary information and information for debugging, etc..
-    df["choice"] = choice
-    df["wage"] = wage
-    df["discount_rate"] = optim_paras["delta"]
-    df["present_bias"] = optim_paras["beta"]
-    for i, choice in enumerate(optim_paras["choices"]):
-        df[f"nonpecuniary_reward_{choice}"] = nonpecs[:, i]
-        df[f"wage_{choice}"] = wages[:, i]
-        df[f"flow_utility_{choice}"] = flow_utilities[:, i]
-        df[f"value_function_{choice}"] = value_functions[:, i]
-        df[f"continuation_value_{choice}"] = continuation_values[:, i]
+    The sub indexers have the same number of dimensions but different shapes. Thus,
+    they are concatenated to one array and the position of a state is computed from the
+    offset and the shape of the sub indexer of its period.
 
-    return df
+    """
+    flat_indexer = np.concatenate([sub_indexer.ravel() for sub_indexer in indexer])
+    indexer_offsets = np.cumsum([0] + [sub_indexer.size for sub_indexer in indexer])
+    indexer_shapes = np.array(
+        [sub_indexer.shape for sub_indexer in indexer], dtype=np.int64
+    ).reshape(len(indexer), -1)
+
+    return flat_indexer, indexer_offsets, indexer_shapes
+
+
+def _stack_attribute_of_sub_state_spaces(state_space, attribute):
+    """Stack an attribute of all sub state spaces along a new first axis."""
+    attr = state_space.get_attribute(attribute)
+    if isinstance(attr, dict):
+        out = np.stack(list(attr.values()))
+    else:
+        out = attr[np.newaxis]
+
+    return out
+
+
+@nb.njit(parallel=True, nogil=True)
+def _simulate_agents_kernel(
+    states,
+    dense_codes,
+    periods,
+    agent_starts,
+    is_n_step_ahead,
+    flat_indexer,
+    indexer_offsets,
+    indexer_shapes,
+    wages,
+    nonpecs,
+    expected_value_functions,
+    indices_of_child_states,
+    is_inadmissible,
+    draws_shock,
+    draws_wage,
+    n_wages,
+    n_choices_w_exp,
+    beta_delta,
+    state_indices,
+    choices,
+    wage,
+    simulated_wages,
+    simulated_nonpecs,
+    flow_utilities,
+    value_functions,
+    continuation_values,
+):
+    """Simulate choices and wages of individuals in parallel.
+
+    The observations of an individual are processed in order. For n-step-ahead
+    simulations, the state and the dense index of an observation are derived from the
+    previous observation of the individual.
+
+    We need to ensure that no individual chooses an inadmissible state. Thus, value
+    functions are set to NaN. This cannot be done in `aggregate_keane_wolpin_utility`
+    as the interpolation requires a mild penalty.
+
+    If an observation cannot be mapped to a state, the simulation of the individual
+    stops and ``state_indices`` keeps the invalid index for the remaining observations.
+
+    """
+    n_agents = agent_starts.shape[0] - 1
+    n_choices = wages.shape[2]
+
+    for agent in nb.prange(n_agents):
+        for row in range(agent_starts[agent], agent_starts[agent + 1]):
+            if is_n_step_ahead and row > agent_starts[agent]:
+                _apply_law_of_motion(
+                    states[row - 1], choices[row - 1], states[row], n_choices_w_exp
+                )
+                dense_codes[row] = dense_codes[row - 1]
+
+            state_index = _get_state_index(
+                states[row], periods[row], flat_indexer, indexer_offsets, indexer_shapes
+            )
+            dense_code = dense_codes[row]
+            if state_index == INDEXER_INVALID_INDEX or dense_code == -1:
+                break
+            state_indices[row] = state_index
+
+            choice = -1
+            max_value_function = 0.0
+            for j in range(n_choices):
+                child_index = indices_of_child_states[state_index, j]
+                if child_index == INDEXER_INVALID_INDEX:
+                    continuation_value = 0.0
+                else:
+                    continuation_value = expected_value_functions[
+                        dense_code, child_index
+                    ]
+
+                value_function, flow_utility = aggregate_keane_wolpin_utility(
+                    wages[dense_code, state_index, j],
+                    nonpecs[dense_code, state_index, j],
+                    continuation_value,
+                    draws_shock[row, j],
+                    beta_delta,
+                )
+
+                if is_inadmissible[state_index, j]:
+                    value_function = np.nan
+                elif choice == -1 or value_function > max_value_function:
+                    choice = j
+                    max_value_function = value_function
+
+                if j < n_wages:
+                    simulated_wages[row, j] = (
+                        wages[dense_code, state_index, j]
+                        * draws_shock[row, j]
+                        * draws_wage[row, j]
+                    )
+                else:
+                    simulated_wages[row, j] = np.nan
+                simulated_nonpecs[row, j] = nonpecs[dense_code, state_index, j]
+                flow_utilities[row, j] = flow_utility
+                value_functions[row, j] = value_function
+                continuation_values[row, j] = continuation_value
+
+            choices[row] = choice
+            wage[row] = simulated_wages[row, choice]
+
+
+_simulate_agents_kernel_serial = nb.njit(nogil=True)(_simulate_agents_kernel.py_func)
+
+
+@nb.njit(nogil=True)
+def _get_state_index(state, period, flat_indexer, indexer_offsets, indexer_shapes):
+    """Get the index of a state or the invalid index if the state does not exist."""
+    if period >= indexer_shapes.shape[0]:
+        return INDEXER_INVALID_INDEX
+
+    position = 0
+    for i in range(state.shape[0]):
+        if state[i] < 0 or state[i] >= indexer_shapes[period, i]:
+            return INDEXER_INVALID_INDEX
+        position = position * indexer_shapes[period, i] + state[i]
+
+    return flat_indexer[indexer_offsets[period] + position]
+
+
+@nb.njit(nogil=True)
+def _apply_law_of_motion(state, choice, next_state, n_choices_w_exp):
+    """Apply the law of motion to get the state in the next period.
+
+    Experiences are incremented according to the choice in the current period. Lagged
+    choices are shifted by one position and the current choice becomes the first lagged
+    choice. We implicitly assume that observed variables are constant.
+
+    """
+    n_lagged_choices = state.shape[0] - n_choices_w_exp
+
+    for i in range(n_choices_w_exp):
+        next_state[i] = state[i] + 1 if choice == i else state[i]
+
+    for i in range(n_lagged_choices - 1, 0, -1):
+        next_state[n_choices_w_exp + i] = state[n_choices_w_exp + i - 1]
+    if n_lagged_choices:
+        next_state[n_choices_w_exp] = choice
 
 
 def _sample_characteristic(states_df, options, level_dict, use_keys):
@@ -394,10 +765,10 @@ def _sample_characteristic(states_df, options, level_dict, use_keys):
     # Calculate probabilities with the softmax function.
     probabilities = softmax(np.column_stack(z), axis=1)
 
-    np.random.seed(next(options["simulation_seed_iteration"]))
+    random_state = np.random.RandomState(next(options["simulation_seed_iteration"]))
 
     choices = level_dict if use_keys else len(level_dict)
-    characteristic = _random_choice(choices, probabilities)
+    characteristic = _random_choice(choices, probabilities, random_state)
 
     return characteristic
 
@@ -409,6 +780,8 @@ def _convert_codes_to_original_labels(df, optim_paras):
     for choice_var in ["Choice"] + [
         f"Lagged_Choice_{i}" for i in range(1, optim_paras["n_lagged_choices"] + 1)
     ]:
+        if choice_var not in df.columns:
+            continue
         df[choice_var] = (
             df[choice_var]
             .astype("category")
@@ -417,22 +790,24 @@ def _convert_codes_to_original_labels(df, optim_paras):
         )
 
     for observable in optim_paras["observables"]:
+        if observable.title() not in df.columns:
+            continue
         code_to_obs = dict(enumerate(optim_paras["observables"][observable]))
         df[f"{observable.title()}"] = df[f"{observable.title()}"].replace(code_to_obs)
 
     return df
 
 
-def _process_simulation_output(data, optim_paras):
+def _process_simulation_output(df, optim_paras):
     """Create simulated data.
 
-    This function takes an array of simulated outcomes and additional information for
-    each period and stacks them together to one DataFrame.
+    This function takes the DataFrame of simulated outcomes and additional information
+    with internal codes and labels and converts it to the external format.
 
     Parameters
     ----------
-    data : list
-        List of DataFrames for each simulated period with internal codes and labels.
+    df : pandas.DataFrame
+        DataFrame of simulated outcomes with internal codes and labels.
     optim_paras : dict
 
     Returns
@@ -442,8 +817,7 @@ def _process_simulation_output(data, optim_paras):
 
     """
     df = (
-        pd.concat(data)
-        .sort_index()
+        df.sort_index()
         .rename(columns=rename_labels_from_internal)
         .rename_axis(index=rename_labels_from_internal)
     )
@@ -455,10 +829,12 @@ def _process_simulation_output(data, optim_paras):
     return df
 
 
-def _random_choice(choices, probabilities=None, decimals=5):
+def _random_choice(choices, probabilities=None, random_state=None, decimals=5):
     """Return elements of choices for a two-dimensional array of probabilities.
 
-    It is assumed that probabilities are ordered (n_samples, n_choices).
+    It is assumed that probabilities are ordered (n_samples, n_choices). The random
+    numbers are drawn from ``random_state``, a :class:`numpy.random.RandomState`. If it
+    is ``None``, the global random state of NumPy is used.
 
     The function is taken from this `StackOverflow post
     <https://stackoverflow.com/questions/40474436>`_ as a workaround for
@@ -507,7 +883,8 @@ def _random_choice(choices, probabilities=None, decimals=5):
     if not (cumulative_distribution[:, -1] == 1).all():
         raise ValueError("Probabilities do not sum to one.")
 
-    u = np.random.rand(cumulative_distribution.shape[0], 1)
+    rand = np.random.rand if random_state is None else random_state.rand
+    u = rand(cumulative_distribution.shape[0], 1)
 
     # Note that :func:`np.argmax` returns the first index for multiple maximum values.
     indices = (u < cumulative_distribution).argmax(axis=1)
@@ -519,65 +896,6 @@ def _random_choice(choices, probabilities=None, decimals=5):
     return out
 
 
-def _apply_law_of_motion(df, optim_paras):
-    """Apply the law of motion to get the states in the next period.
-
-    For n-step-ahead simulations, the states of the next period are generated from the
-    current states and the current decision. This function changes experiences and
-    previous choices according to the choice in the current period, to get the states of
-    the next period.
-
-    We implicitly assume that observed variables are constant.
-
-    Parameters
-    ----------
-    df : pandas.DataFrame
-        The DataFrame contains the simulated information of individuals in one period.
-    optim_paras : dict
-
-    Returns
-    -------
-    df : pandas.DataFrame
-        The DataFrame contains the states of individuals in the next period.
-
-    """
-    df = df.copy()
-    n_lagged_choices = optim_paras["n_lagged_choices"]
-
-    # Update work experiences.
-    for i, choice in enumerate(optim_paras["choices_w_exp"]):
-        df[f"exp_{choice}"] += df["choice"] == i
-
-    # Update lagged choices by deleting oldest lagged, renaming other lags and inserting
-    # choice in the first position.
-    if n_lagged_choices:
-        # Save position of first lagged choice.
-        position = df.columns.tolist().index("lagged_choice_1")
-
-        # Drop oldest lag.
-        df = df.drop(columns=f"lagged_choice_{n_lagged_choices}")
-
-        # Rename newer lags
-        rename_lagged_choices = {
-            f"lagged_choice_{i}": f"lagged_choice_{i + 1}"
-            for i in range(1, n_lagged_choices)
-        }
-        df = df.rename(columns=rename_lagged_choices)
-
-        # Add current choice as new lag.
-        df.insert(position, "lagged_choice_1", df["choice"])
-
-    # Increment period in MultiIndex by one.
-    df.index = df.index.set_levels(
-        df.index.get_level_values("period") + 1, level="period", verify_integrity=False
-    )
-
-    state_space_columns = create_state_space_columns(optim_paras)
-    df = df[state_space_columns]
-
-    return df
-
-
 def _harmonize_simulation_arguments(method, df, n_sim_p, options):
     """Harmonize the arguments of the simulation."""
     if method == "n_step_ahead_with_sampling":
@@ -3,8 +3,9 @@ import functools
 
 import numpy as np
 
-from respy.config import COVARIATES_DOT_PRODUCT_DTYPE
 from respy.config import INADMISSIBILITY_PENALTY
+from respy.instrumentation import instrument
+from respy.interpolate import get_seeds_for_interpolation
 from respy.interpolate import interpolate
 from respy.parallelization import parallelize_across_dense_dimensions
 from respy.pre_processing.model_processing import process_params_and_options
@@ -42,60 +43,241 @@ def get_solve_func(params, options):
 
 
 def solve(params, options, state_space):
-    """Solve the model."""
+    """Solve the model.
+
+    If the parameters which affect the solution are the same as in the previous call,
+    the state space already contains the solution and is returned immediately. Thus,
+    changing only other parameters like the standard deviations of measurement errors
+    or the coefficients of type probabilities does not trigger a new backward induction.
+
+    If ``options["partial_resolve"]`` is ``True`` and only reward parameters changed,
+    the model is partially re-solved. Only the rewards of choices with changed
+    parameters are recomputed and the backward induction starts in the last period in
+    which a covariate of a changed parameter is not zero. The results are identical to
+    a full solution. This is useful for numerical derivatives where one parameter is
+    perturbed at a time.
+
+    """
     optim_paras, options = process_params_and_options(params, options)
 
-    states = state_space.states
+    solution_parameters = _get_parameters_affecting_solution(optim_paras)
+    previous_parameters = state_space.solution_parameters
+    is_reused = _are_parameters_equal(solution_parameters, previous_parameters)
+
+    with instrument("solve", options, is_reused=is_reused):
+        if not is_reused:
+            state_space = _solve(
+                state_space,
+                solution_parameters,
+                previous_parameters,
+                optim_paras,
+                options,
+            )
+
+    return state_space
+
+
+def _solve(state_space, solution_parameters, previous_parameters, optim_paras, options):
+    """Solve the model fully or partially if only reward parameters changed."""
+    # Invalidate the previous solution in case the following steps fail.
+    state_space.solution_parameters = None
+
+    design_matrices = state_space.get_attribute("design_matrices")
     is_inadmissible = state_space.get_attribute("is_inadmissible")
 
-    wages, nonpecs = _create_choice_rewards(states, is_inadmissible, optim_paras)
+    changed_rewards = _get_changed_rewards(solution_parameters, previous_parameters)
+    if options["partial_resolve"] and changed_rewards is not None:
+        wages, nonpecs = _update_choice_rewards(
+            state_space.get_attribute("wages"),
+            state_space.get_attribute("nonpecs"),
+            design_matrices,
+            is_inadmissible,
+            optim_paras,
+            list(changed_rewards),
+            n_jobs=options["n_jobs"],
+        )
+        last_period = _get_last_period_with_changed_rewards(
+            state_space, changed_rewards
+        )
+    else:
+        wages, nonpecs = _create_choice_rewards(
+            design_matrices, is_inadmissible, optim_paras, n_jobs=options["n_jobs"]
+        )
+        last_period = optim_paras["n_periods"] - 1
     state_space.set_attribute("wages", wages)
     state_space.set_attribute("nonpecs", nonpecs)
 
-    state_space = _solve_with_backward_induction(state_space, optim_paras, options)
+    state_space = _solve_with_backward_induction(
+        state_space, optim_paras, options, last_period
+    )
+    state_space.solution_parameters = solution_parameters
 
     return state_space
 
 
+def _get_parameters_affecting_solution(optim_paras):
+    """Collect copies of all parameters which affect the solution of the model.
+
+    These are the parameters of the rewards, the shocks, the discount factor, the size of
+    the ambiguity set and the penalty for inadmissible choices. The present bias,
+    ``beta``, only affects the choices and not the expected value functions.
+
+    """
+    keys = ["delta", "eta", "shocks_cholesky"] + [
+        f"{reward}_{choice}"
+        for choice in optim_paras["choices"]
+        for reward in ["wage", "nonpec"]
+        if f"{reward}_{choice}" in optim_paras
+    ]
+    parameters = {key: np.array(optim_paras[key], dtype=np.float64) for key in keys}
+
+    penalty = optim_paras["inadmissibility_penalty"]
+    penalty = INADMISSIBILITY_PENALTY if penalty is None else penalty
+    parameters["inadmissibility_penalty"] = np.array(penalty, dtype=np.float64)
+
+    return parameters
+
+
+def _are_parameters_equal(parameters, other_parameters):
+    """Check whether two collections of parameters are equal."""
+    return (
+        other_parameters is not None
+        and parameters.keys() == other_parameters.keys()
+        and all(
+            np.array_equal(parameters[key], other_parameters[key]) for key in parameters
+        )
+    )
+
+
+def _get_changed_rewards(parameters, previous_parameters):
+    """Get the rewards with changed parameters.
+
+    Returns
+    -------
+    changed_rewards : dict or None
+        Dictionary with keys like ``"wage_a"`` and boolean arrays indicating which
+        parameters of the reward changed. ``None`` if other parameters than rewards
+        changed or there is no previous solution.
+
+    """
+    if previous_parameters is None or parameters.keys() != previous_parameters.keys():
+        changed_rewards = None
+    else:
+        is_changed = {
+            key: parameters[key] != previous_parameters[key] for key in parameters
+        }
+        changed_keys = [key for key, value in is_changed.items() if value.any()]
+
+        if all(key.startswith(("wage_", "nonpec_")) for key in changed_keys):
+            changed_rewards = {key: is_changed[key] for key in changed_keys}
+        else:
+            changed_rewards = None
+
+    return changed_rewards
+
+
+def _get_last_period_with_changed_rewards(state_space, changed_rewards):
+    """Get the last period in which rewards are affected by changed parameters.
+
+    The reward of a state does not change if the covariates of all changed parameters
+    are zero. The expected value functions in later periods do not depend on the
+    rewards of earlier periods and do not have to be recomputed.
+
+    """
+    last_periods = state_space.get_attribute("last_periods_of_covariates")
+    if hasattr(state_space, "sub_state_spaces"):
+        last_periods = list(last_periods.values())
+    else:
+        last_periods = [last_periods]
+
+    last_period = max(
+        last_periods_[reward][is_changed].max(initial=-1)
+        for last_periods_ in last_periods
+        for reward, is_changed in changed_rewards.items()
+    )
+
+    return last_period
+
+
 @parallelize_across_dense_dimensions
-def _create_choice_rewards(states, is_inadmissible, optim_paras):
+def _create_choice_rewards(design_matrices, is_inadmissible, optim_paras):
     """Create wage and non-pecuniary reward for each state and choice.
 
     Note that missing wages filled with ones and missing non-pecuniary rewards with
     zeros. This is done in :meth:`_initialize_attributes`.
 
     """
-    n_states = states.shape[0]
-    n_choices = len(optim_paras["choices"])
+    n_states, n_choices = is_inadmissible.shape
 
     wages = np.ones((n_states, n_choices))
     nonpecs = np.zeros((n_states, n_choices))
 
-    for i, choice in enumerate(optim_paras["choices"]):
-        if f"wage_{choice}" in optim_paras:
-            wage_columns = optim_paras[f"wage_{choice}"].index
-            log_wage = np.dot(
-                states[wage_columns].to_numpy(dtype=COVARIATES_DOT_PRODUCT_DTYPE),
-                optim_paras[f"wage_{choice}"].to_numpy(),
-            )
-            wages[:, i] = np.exp(log_wage)
+    rewards = [
+        f"{reward}_{choice}"
+        for choice in optim_paras["choices"]
+        for reward in ["wage", "nonpec"]
+    ]
 
-        if f"nonpec_{choice}" in optim_paras:
-            nonpec_columns = optim_paras[f"nonpec_{choice}"].index
-            nonpecs[:, i] = np.dot(
-                states[nonpec_columns].to_numpy(dtype=COVARIATES_DOT_PRODUCT_DTYPE),
-                optim_paras[f"nonpec_{choice}"].to_numpy(),
-            )
+    return _update_choice_rewards(
+        wages, nonpecs, design_matrices, is_inadmissible, optim_paras, rewards
+    )
+
+
+@parallelize_across_dense_dimensions
+def _update_choice_rewards(
+    wages, nonpecs, design_matrices, is_inadmissible, optim_paras, rewards
+):
+    """Update the wage and non-pecuniary rewards of some choices in-place.
+
+    The design matrices are created once with the state space. Thus, each reward is a
+    single matrix-vector product.
+
+    Parameters
+    ----------
+    wages : numpy.ndarray
+        Array with shape (n_states, n_choices).
+    nonpecs : numpy.ndarray
+        Array with shape (n_states, n_choices).
+    design_matrices : dict
+        Dictionary with the design matrices of the rewards.
+    is_inadmissible : numpy.ndarray
+        Array with shape (n_states, n_choices) indicating inadmissible choices.
+    optim_paras : dict
+        Parsed model parameters affected by the optimization.
+    rewards : list
+        Rewards which are updated, e.g., ``["wage_a", "nonpec_b"]``.
 
-    # For inadmissible choices apply a penalty to the non-pecuniary rewards.
+    """
     penalty = optim_paras["inadmissibility_penalty"]
     penalty = INADMISSIBILITY_PENALTY if penalty is None else penalty
-    nonpecs[is_inadmissible] += penalty
+
+    for i, choice in enumerate(optim_paras["choices"]):
+        if f"wage_{choice}" in rewards:
+            if f"wage_{choice}" in optim_paras:
+                log_wage = np.dot(
+                    design_matrices[f"wage_{choice}"],
+                    optim_paras[f"wage_{choice}"].to_numpy(),
+                )
+                wages[:, i] = np.exp(log_wage)
+            else:
+                wages[:, i] = 1
+
+        if f"nonpec_{choice}" in rewards:
+            if f"nonpec_{choice}" in optim_paras:
+                nonpecs[:, i] = np.dot(
+                    design_matrices[f"nonpec_{choice}"],
+                    optim_paras[f"nonpec_{choice}"].to_numpy(),
+                )
+            else:
+                nonpecs[:, i] = 0
+
+            # For inadmissible choices apply a penalty to the non-pecuniary rewards.
+            nonpecs[is_inadmissible[:, i], i] += penalty
 
     return wages, nonpecs
 
 
-def _solve_with_backward_induction(state_space, optim_paras, options):
+def _solve_with_backward_induction(state_space, optim_paras, options, last_period=None):
     """Calculate utilities with backward induction.
 
     Parameters
@@ -106,6 +288,11 @@ def _solve_with_backward_induction(state_space, optim_paras, options):
         Parsed model parameters affected by the optimization.
     options : dict
         Optimization independent model options.
+    last_period : int or None, default None
+        The backward induction starts in this period and keeps the expected value
+        functions of later periods. The seeds of the interpolation in later periods are
+        consumed anyway to keep the results identical to a full solution. ``None``
+        starts in the last period of the model.
 
     Returns
     -------
@@ -119,13 +306,10 @@ def _solve_with_backward_induction(state_space, optim_paras, options):
         state_space.base_draws_sol, optim_paras["shocks_cholesky"], n_wages
     )
 
-    for period in reversed(range(n_periods)):
-        n_core_states = state_space.core.query("period == @period").shape[0]
+    last_period = n_periods - 1 if last_period is None else last_period
 
-        wages = state_space.get_attribute_from_period("wages", period)
-        nonpecs = state_space.get_attribute_from_period("nonpecs", period)
-        continuation_values = state_space.get_continuation_values(period)
-        period_draws_emax_risk = draws_emax_risk[period]
+    for period in reversed(range(n_periods)):
+        n_core_states = state_space.get_n_states_in_period(period)
 
         # The number of interpolation points is the same for all periods. Thus, for
         # some periods the number of interpolation points is larger than the actual
@@ -137,35 +321,59 @@ def _solve_with_backward_induction(state_space, optim_paras, options):
             and options["interpolation_points"] != -1
         )
 
-        # Handle myopic individuals.
-        if optim_paras["delta"] == 0:
-            if hasattr(state_space, "sub_state_spaces"):
-                period_expected_value_functions = {
-                    dense_idx: 0 for dense_idx in state_space.sub_state_spaces
-                }
-            else:
-                period_expected_value_functions = 0
-
-        elif any_interpolated:
-            period_expected_value_functions = interpolate(
-                state_space, period_draws_emax_risk, period, optim_paras, options
-            )
+        if period > last_period:
+            if optim_paras["delta"] != 0 and any_interpolated:
+                get_seeds_for_interpolation(state_space, options)
+            continue
+
+        with instrument(
+            "backward_induction",
+            options,
+            period=period,
+            n_states=n_states_in_period,
+            n_draws=draws_emax_risk.shape[1],
+            is_interpolated=any_interpolated,
+        ):
+            wages = state_space.get_attribute_from_period("wages", period)
+            nonpecs = state_space.get_attribute_from_period("nonpecs", period)
+            continuation_values = state_space.get_continuation_values(period)
+            period_draws_emax_risk = draws_emax_risk[period]
+
+            # Handle myopic individuals.
+            if optim_paras["delta"] == 0:
+                if hasattr(state_space, "sub_state_spaces"):
+                    period_expected_value_functions = {
+                        dense_idx: 0 for dense_idx in state_space.sub_state_spaces
+                    }
+                else:
+                    period_expected_value_functions = 0
+
+            elif any_interpolated:
+                period_expected_value_functions = interpolate(
+                    state_space, period_draws_emax_risk, period, optim_paras, options
+                )
 
-        else:
-            period_expected_value_functions = _full_solution(
-                wages, nonpecs, continuation_values, period_draws_emax_risk, optim_paras
+            else:
+                period_expected_value_functions = _full_solution(
+                    wages,
+                    nonpecs,
+                    continuation_values,
+                    period_draws_emax_risk,
+                    optim_paras,
+                    options,
+                    n_jobs=options["n_jobs"],
+                )
+
+            state_space.set_attribute_from_period(
+                "expected_value_functions", period_expected_value_functions, period
             )
 
-        state_space.set_attribute_from_period(
-            "expected_value_functions", period_expected_value_functions, period
-        )
-
     return state_space
 
 
 @parallelize_across_dense_dimensions
 def _full_solution(
-    wages, nonpecs, continuation_values, period_draws_emax_risk, optim_paras
+    wages, nonpecs, continuation_values, period_draws_emax_risk, optim_paras, options
 ):
     """Calculate the full solution of the model.
 
@@ -180,6 +388,9 @@ def _full_solution(
         period_draws_emax_risk,
         optim_paras["delta"],
         optim_paras["eta"],
+        options["ambiguity_max_iterations"],
+        options["ambiguity_tolerance"],
+        options["precision"],
     )
 
     return period_expected_value_functions
@@ -1,12 +1,17 @@
 """Everything related to the state space of a structural model."""
+import collections
 import itertools
+import tempfile
+import uuid
 import warnings
+from pathlib import Path
 
 import numba as nb
 import numpy as np
 import pandas as pd
 
 from respy._numba import array_to_tuple
+from respy.config import COVARIATES_DOT_PRODUCT_DTYPE
 from respy.config import INADMISSIBILITY_PENALTY
 from respy.config import INDEXER_DTYPE
 from respy.config import INDEXER_INVALID_INDEX
@@ -26,12 +31,14 @@ def create_state_space_class(optim_paras, options):
     # Downcast after calculations or be aware of silent integer overflows.
     core = compute_covariates(core, options["covariates_core"])
     core = core.apply(downcast_to_smallest_dtype)
+    core = {column: core[column].to_numpy() for column in core}
     dense = _create_dense_state_space_covariates(dense_grid, optim_paras, options)
 
     base_draws_sol = create_base_draws(
         (options["n_periods"], options["solution_draws"], len(optim_paras["choices"])),
         next(options["solution_seed_startup"]),
         options["monte_carlo_sequence"],
+        options["cache_directory"],
     )
 
     if dense:
@@ -46,14 +53,126 @@ def create_state_space_class(optim_paras, options):
     return state_space
 
 
+_MemoryMapHandle = collections.namedtuple(
+    "_MemoryMapHandle", ["filename", "dtype", "shape", "offset", "mode"]
+)
+"""collections.namedtuple : Replaces a memory-mapped array while pickling."""
+
+
+def _replace_memory_map_with_handle(value):
+    if isinstance(value, np.memmap):
+        # Reopening a file with mode "w+" would overwrite it.
+        mode = "r+" if value.mode == "w+" else value.mode
+        value = _MemoryMapHandle(
+            value.filename, value.dtype, value.shape, value.offset, mode
+        )
+
+    return value
+
+
+def _replace_handle_with_memory_map(value):
+    if isinstance(value, _MemoryMapHandle):
+        value = np.memmap(
+            value.filename,
+            dtype=value.dtype,
+            mode=value.mode,
+            shape=value.shape,
+            offset=value.offset,
+        )
+
+    return value
+
+
 class _BaseStateSpace:
     """The base class of a state space.
 
     The base class includes some methods which should be available to both state spaces
     and are shared between multiple sub state spaces.
 
+    The core state space is stored column-wise in ``core_arrays``, a dictionary of
+    arrays with the smallest possible dtypes. The states of each period are stored
+    contiguously such that ``slices_by_periods`` can select them without copies. A
+    :class:`pandas.DataFrame` of the core state space is only created on demand by
+    :attr:`core`.
+
+    If ``options["memory_map_directory"]`` is a directory, the arrays of the state space
+    are allocated as memory-mapped files in a temporary sub-directory. Pickling the
+    state space only stores the locations of the files. Thus, sending the state space to
+    another process is cheap and the process works on the same memory instead of a
+    copy. The temporary directory is removed if the state space of the creating process
+    is garbage collected.
+
     """
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Only the creating process is responsible for the temporary directory.
+        state["_temporary_directory"] = None
+        for attribute, value in state.items():
+            if isinstance(value, list):
+                state[attribute] = [_replace_memory_map_with_handle(i) for i in value]
+            elif isinstance(value, dict):
+                state[attribute] = {
+                    k: _replace_memory_map_with_handle(v) for k, v in value.items()
+                }
+            else:
+                state[attribute] = _replace_memory_map_with_handle(value)
+
+        return state
+
+    def __setstate__(self, state):
+        for attribute, value in state.items():
+            if isinstance(value, list):
+                state[attribute] = [_replace_handle_with_memory_map(i) for i in value]
+            elif isinstance(value, dict):
+                state[attribute] = {
+                    k: _replace_handle_with_memory_map(v) for k, v in value.items()
+                }
+            else:
+                state[attribute] = _replace_handle_with_memory_map(value)
+        self.__dict__.update(state)
+
+    @property
+    def core(self):
+        """pandas.DataFrame : The core state space."""
+        return pd.DataFrame(self.core_arrays)
+
+    def get_n_states_in_period(self, period):
+        """Get the number of core states in a period."""
+        slice_ = self.slices_by_periods[period]
+        return slice_.stop - slice_.start
+
+    def _create_memory_map_directory(self, options):
+        """Create a temporary directory for memory-mapped arrays if requested."""
+        if options["memory_map_directory"] is None:
+            self._temporary_directory = None
+            self.memory_map_directory = None
+        else:
+            self._temporary_directory = tempfile.TemporaryDirectory(
+                prefix="respy-", dir=options["memory_map_directory"]
+            )
+            self.memory_map_directory = self._temporary_directory.name
+
+    def _allocate_array(self, shape, dtype):
+        """Allocate an uninitialized array which might be memory-mapped."""
+        if self.memory_map_directory is None:
+            array = np.empty(shape, dtype=dtype)
+        else:
+            filename = Path(self.memory_map_directory, f"{uuid.uuid4().hex}.dat")
+            array = np.memmap(filename, dtype=dtype, mode="w+", shape=shape)
+
+        return array
+
+    def _share_array(self, array):
+        """Copy an array to a memory-mapped file if requested."""
+        if self.memory_map_directory is None:
+            shared_array = array
+        else:
+            shared_array = self._allocate_array(array.shape, array.dtype)
+            shared_array[:] = array
+
+        return shared_array
+
     def _create_slices_by_core_periods(self):
         """Create slices to index all attributes in a given period.
 
@@ -61,16 +180,15 @@ class _BaseStateSpace:
         results in copies of array which decrease performance and raise memory usage.
 
         """
-        period = self.core.period
-        indices = np.where(period - period.shift(1).fillna(-1) == 1)[0]
-        indices = np.append(indices, self.core.shape[0])
+        n_states_per_period = np.bincount(self.core_arrays["period"])
+        indices = np.concatenate(([0], np.cumsum(n_states_per_period)))
 
         slices = [slice(indices[i], indices[i + 1]) for i in range(len(indices) - 1)]
 
         return slices
 
     def _create_is_inadmissible(self, optim_paras, options):
-        core = self.core.copy()
+        core = self.core
 
         for choice in optim_paras["choices"]:
             core[choice] = False
@@ -89,7 +207,7 @@ class _BaseStateSpace:
                 "not dominate the linear interpolation model."
             )
 
-        return is_inadmissible
+        return self._share_array(is_inadmissible)
 
     def _create_indices_of_child_states(self, optim_paras):
         """For each parent state get the indices of child states.
@@ -107,8 +225,11 @@ class _BaseStateSpace:
         n_choices = len(optim_paras["choices"])
         n_choices_w_exp = len(optim_paras["choices_w_exp"])
         n_periods = optim_paras["n_periods"]
-        n_states = self.core.shape[0]
+        n_states = self.core_arrays["period"].shape[0]
         core_columns = create_core_state_space_columns(optim_paras)
+        states = np.column_stack(
+            [self.core_arrays[column] for column in core_columns]
+        ).astype(np.int8)
 
         indices = np.full(
             (n_states, n_choices), INDEXER_INVALID_INDEX, dtype=INDEXER_DTYPE
@@ -116,9 +237,7 @@ class _BaseStateSpace:
 
         # Skip the last period which does not have child states.
         for period in reversed(range(n_periods - 1)):
-            states_in_period = self.core.query("period == @period")[
-                core_columns
-            ].to_numpy(dtype=np.int8)
+            states_in_period = states[self.slices_by_periods[period]]
 
             indices = _insert_indices_of_child_states(
                 indices,
@@ -130,7 +249,7 @@ class _BaseStateSpace:
                 optim_paras["n_lagged_choices"],
             )
 
-        return indices
+        return self._share_array(indices)
 
 
 class _SingleDimStateSpace(_BaseStateSpace):
@@ -138,14 +257,17 @@ class _SingleDimStateSpace(_BaseStateSpace):
 
     Parameters
     ----------
-    core : pandas.DataFrame
-        DataFrame containing the core state space.
+    core : dict
+        Dictionary with the columns of the core state space as arrays.
     indexer : numpy.ndarray
         Multidimensional array containing indices of states in valid positions.
     optim_paras : dict
         Dictionary containing model parameters.
     options : dict
         Dictionary containing optimization independent model options.
+    memory_map_directory : str or None
+        Directory of the memory-mapped arrays. Only used by sub state spaces which share
+        the directory of :class:`_MultiDimStateSpace`.
 
     Attributes
     ----------
@@ -154,9 +276,20 @@ class _SingleDimStateSpace(_BaseStateSpace):
         lagged_choice and type information.
     indexer : numpy.ndarray
         Array with shape (n_periods, n_periods, n_periods, edu_max, n_choices, n_types).
-    covariates : numpy.ndarray
-        Array with shape (n_states, n_covariates) containing covariates of each state
-        necessary to calculate rewards.
+    covariates : dict
+        Dictionary with arrays of shape (n_states,) containing the covariates of each
+        state which are necessary to calculate rewards. Covariates which only depend on
+        the dense dimensions are stored as scalars.
+    design_matrices : dict
+        Dictionary with keys like ``"wage_a"`` or ``"nonpec_b"`` and arrays with shape
+        (n_states, n_covariates) which are multiplied with the parameters of the reward.
+    last_periods_of_covariates : dict
+        Dictionary with the same keys as ``design_matrices`` and arrays with shape
+        (n_covariates,) containing the last period in which the covariate is not zero.
+    solution_parameters : dict or None
+        Parameters of the current solution, see
+        :func:`respy.solve._get_parameters_affecting_solution`. ``None`` if the state
+        space is not solved.
     wages : numpy.ndarray
         Array with shape (n_states_in_period, n_choices) which contains zeros in places
         for choices without wages.
@@ -184,13 +317,30 @@ class _SingleDimStateSpace(_BaseStateSpace):
         is_inadmissible=None,
         indices_of_child_states=None,
         slices_by_periods=None,
+        memory_map_directory=None,
     ):
+        if dense_dim is None:
+            self._create_memory_map_directory(options)
+        else:
+            self._temporary_directory = None
+            self.memory_map_directory = memory_map_directory
         self.dense_dim = dense_dim
-        self.core = core
-        self.indexer = indexer
+        self.core_arrays = (
+            {column: self._share_array(array) for column, array in core.items()}
+            if dense_dim is None
+            else core
+        )
+        self.indexer = (
+            [self._share_array(sub_indexer) for sub_indexer in indexer]
+            if dense_dim is None
+            else indexer
+        )
         self.dense_covariates = dense_covariates if dense_covariates is not None else {}
-        self.mixed_covariates = options["covariates_mixed"]
-        self.base_draws_sol = base_draws_sol
+        self.covariates = self._create_covariates(options)
+        self.design_matrices = self._create_design_matrices(optim_paras)
+        self.base_draws_sol = (
+            self._share_array(base_draws_sol) if dense_dim is None else base_draws_sol
+        )
         self.slices_by_periods = (
             super()._create_slices_by_core_periods()
             if slices_by_periods is None
@@ -206,8 +356,72 @@ class _SingleDimStateSpace(_BaseStateSpace):
             if indices_of_child_states is None
             else indices_of_child_states
         )
+        self.last_periods_of_covariates = self._create_last_periods_of_covariates()
+        n_states, n_choices = self.is_inadmissible.shape
+        if self.memory_map_directory is not None:
+            self.wages = self._allocate_array((n_states, n_choices), np.float64)
+            self.nonpecs = self._allocate_array((n_states, n_choices), np.float64)
         # HOTFIX: Will be removed with flexible choice sets.
-        self.expected_value_functions = np.empty(self.core.shape[0])
+        self.expected_value_functions = self._allocate_array(n_states, np.float64)
+        self.solution_parameters = None
+
+    def _create_covariates(self, options):
+        """Create the covariates of the state space.
+
+        Covariates of the core state space are shared with all other sub state spaces.
+        Covariates which depend on the core and dense state space are computed once and
+        downcast to the smallest possible dtype.
+
+        """
+        mixed_covariates = options["covariates_mixed"]
+        if mixed_covariates:
+            states = self.core.assign(**self.dense_covariates)
+            states = compute_covariates(states, mixed_covariates)
+            mixed_covariates = {
+                covariate: self._share_array(
+                    downcast_to_smallest_dtype(states[covariate]).to_numpy()
+                )
+                for covariate in mixed_covariates
+            }
+
+        return {**self.core_arrays, **self.dense_covariates, **mixed_covariates}
+
+    def _create_design_matrices(self, optim_paras):
+        """Create the design matrices of the wage and non-pecuniary rewards.
+
+        The covariates are identical for every parameter vector. Thus, the matrices
+        which are multiplied with the parameters to compute the rewards of a choice are
+        created once as contiguous arrays.
+
+        """
+        n_states = self.core_arrays["period"].shape[0]
+
+        design_matrices = {}
+        for choice in optim_paras["choices"]:
+            for reward in ["wage", "nonpec"]:
+                if f"{reward}_{choice}" in optim_paras:
+                    columns = optim_paras[f"{reward}_{choice}"].index
+                    design_matrices[f"{reward}_{choice}"] = self._share_array(
+                        _create_design_matrix(self.covariates, columns, n_states)
+                    )
+
+        return design_matrices
+
+    def _create_last_periods_of_covariates(self):
+        """Create the last period in which a covariate of a reward is not zero.
+
+        The information is used to skip periods in a partial re-solve of the model, see
+        :func:`respy.solve.solve`.
+
+        """
+        last_periods = {}
+        for reward, design_matrix in self.design_matrices.items():
+            last_periods_ = np.full(design_matrix.shape[1], -1)
+            for period, slice_ in enumerate(self.slices_by_periods):
+                last_periods_[(design_matrix[slice_] != 0).any(axis=0)] = period
+            last_periods[reward] = last_periods_
+
+        return last_periods
 
     def get_attribute(self, attr):
         """Get an attribute of the state space."""
@@ -280,16 +494,27 @@ class _SingleDimStateSpace(_BaseStateSpace):
         return continuation_values
 
     def set_attribute(self, attribute, value):
-        setattr(self, attribute, value)
+        """Set an attribute of the state space.
+
+        Memory-mapped attributes are overwritten in-place such that other processes
+        which share the state space see the new values.
+
+        """
+        current_value = getattr(self, attribute, None)
+        if isinstance(current_value, np.memmap) and current_value.shape == np.shape(
+            value
+        ):
+            current_value[:] = value
+        else:
+            setattr(self, attribute, value)
 
     def set_attribute_from_period(self, attribute, value, period):
         self.get_attribute_from_period(attribute, period)[:] = value
 
     @property
     def states(self):
-        states = self.core.copy().assign(**self.dense_covariates)
-        states = compute_covariates(states, self.mixed_covariates)
-        return states
+        """pandas.DataFrame : The states with all covariates."""
+        return pd.DataFrame(self.covariates)
 
 
 class _MultiDimStateSpace(_BaseStateSpace):
@@ -300,17 +525,20 @@ class _MultiDimStateSpace(_BaseStateSpace):
     """
 
     def __init__(self, core, indexer, base_draws_sol, optim_paras, options, dense):
-        self.base_draws_sol = base_draws_sol
-        self.core = core
-        self.indexer = indexer
+        self._create_memory_map_directory(options)
+        self.base_draws_sol = self._share_array(base_draws_sol)
+        self.core_arrays = {
+            column: self._share_array(array) for column, array in core.items()
+        }
+        self.indexer = [self._share_array(sub_indexer) for sub_indexer in indexer]
+        self.slices_by_periods = super()._create_slices_by_core_periods()
         self.is_inadmissible = super()._create_is_inadmissible(optim_paras, options)
         self.indices_of_child_states = super()._create_indices_of_child_states(
             optim_paras
         )
-        self.slices_by_periods = super()._create_slices_by_core_periods()
         self.sub_state_spaces = {
             dense_dim: _SingleDimStateSpace(
-                self.core,
+                self.core_arrays,
                 self.indexer,
                 self.base_draws_sol,
                 optim_paras,
@@ -320,9 +548,11 @@ class _MultiDimStateSpace(_BaseStateSpace):
                 self.is_inadmissible,
                 self.indices_of_child_states,
                 self.slices_by_periods,
+                self.memory_map_directory,
             )
             for dense_dim, dense_covariates in dense.items()
         }
+        self.solution_parameters = None
 
     def get_attribute(self, attribute):
         return {
@@ -355,6 +585,22 @@ class _MultiDimStateSpace(_BaseStateSpace):
         return {key: sss.states for key, sss in self.sub_state_spaces.items()}
 
 
+def _create_design_matrix(covariates, columns, n_states):
+    """Create the matrix of covariates which is multiplied with the parameters.
+
+    Covariates which only depend on the dense dimensions are scalars and broadcast to
+    all states.
+
+    """
+    design_matrix = np.empty(
+        (n_states, len(columns)), dtype=COVARIATES_DOT_PRODUCT_DTYPE
+    )
+    for i, column in enumerate(columns):
+        design_matrix[:, i] = covariates[column]
+
+    return design_matrix
+
+
 def _create_core_and_indexer(optim_paras, options):
     """Create the state space.
 
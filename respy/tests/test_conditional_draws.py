@@ -8,6 +8,7 @@ from respy.conditional_draws import calculate_conditional_draws
 from respy.conditional_draws import update_cholcov
 from respy.conditional_draws import update_cholcov_with_measurement_error
 from respy.conditional_draws import update_mean_and_evaluate_likelihood
+from respy.conditional_draws import update_means_and_log_prob_wages
 from respy.config import MAX_LOG_FLOAT
 from respy.config import TEST_RESOURCES_DIR
 
@@ -74,3 +75,45 @@ def test_calculate_conditional_draws():
     expected = np.array([1.64872127, 0.36787944, 5])
 
     aaae(calculated, expected)
+
+
+@pytest.mark.parametrize("has_meas_error", [False, True])
+def test_vectorized_update_of_means_against_guvectorize(seed, has_meas_error):
+    np.random.seed(seed)
+    n_obs, n_choices, n_wages = 100, 4, 2
+
+    shocks_cholesky = np.linalg.cholesky(
+        np.cov(np.random.normal(size=(n_choices, 3 * n_choices)))
+    )
+    meas_sds = np.zeros(n_choices)
+    meas_sds[:n_wages] = np.random.uniform(0.1, 0.5, size=n_wages) * has_meas_error
+    choices = np.random.choice(n_choices, size=n_obs)
+    wages_systematic = np.random.lognormal(size=(n_obs, n_choices))
+    log_wage_observed = np.where(
+        choices < n_wages, np.random.normal(size=n_obs), np.nan
+    )
+    log_wage_observed[np.random.choice(n_obs, size=10)] = np.nan
+
+    log_wage_systematic = np.log(wages_systematic[np.arange(n_obs), choices])
+    expected_means, expected_loglikes = update_mean_and_evaluate_likelihood(
+        log_wage_observed,
+        log_wage_systematic,
+        shocks_cholesky @ shocks_cholesky.T,
+        choices.astype(np.uint16),
+        meas_sds,
+    )
+
+    means, loglikes, chol_indices = update_means_and_log_prob_wages(
+        log_wage_observed,
+        wages_systematic,
+        choices,
+        shocks_cholesky,
+        n_wages,
+        meas_sds,
+    )
+
+    np.testing.assert_array_equal(means, expected_means)
+    np.testing.assert_allclose(loglikes, expected_loglikes, rtol=1e-12)
+    np.testing.assert_array_equal(
+        chol_indices, np.where(np.isfinite(log_wage_observed), choices, n_wages)
+    )
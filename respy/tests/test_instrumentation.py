@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import respy as rp
+from respy.likelihood import get_crit_func
+from respy.simulate import get_simulate_func
+from respy.tests.utils import process_model_or_seed
+
+
+@pytest.mark.parametrize(
+    "model, interpolation_points", [("kw_94_one", 200), ("kw_97_basic", -1)]
+)
+def test_instrumentation_records_stages(model, interpolation_points):
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 10
+    options["interpolation_points"] = interpolation_points
+
+    simulate = get_simulate_func(params, options)
+    df = simulate(params)
+    log_like = get_crit_func(params, options, df)
+    expected = log_like(params)
+
+    options["instrumentation"] = collector = rp.Collector()
+
+    simulate = get_simulate_func(params, options)
+    df_ = simulate(params)
+    log_like = get_crit_func(params, options, df)
+    result = log_like(params)
+    log_like(params)
+
+    assert df.equals(df_)
+    assert result == expected
+
+    records = collector.to_frame()
+    summary = collector.summarize()
+
+    assert summary.loc["solve", "n_calls"] == 3
+    assert records.query("stage == 'solve'").is_reused.tolist() == [
+        False,
+        False,
+        True,
+    ]
+    assert summary.loc["backward_induction", "n_calls"] == 2 * options["n_periods"]
+    assert summary.loc["simulate_agents", "n_calls"] == 1
+    assert summary.loc["likelihood_contributions", "n_calls"] == 2
+    assert summary.loc["choice_probabilities", "n_calls"] >= 2
+    assert (
+        summary.loc["wage_likelihood", "n_calls"]
+        == summary.loc["choice_probabilities", "n_calls"]
+    )
+    assert (
+        "interpolate" in summary.index
+        if interpolation_points != -1
+        else "interpolate" not in summary.index
+    )
+    assert np.all(records.duration >= 0)
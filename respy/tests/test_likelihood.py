@@ -1,7 +1,14 @@
 import numpy as np
 import pandas as pd
 import pytest
+from scipy import special
 
+from respy.conditional_draws import create_draws_and_log_prob_wages
+from respy.conditional_draws import update_cholesky_factors
+from respy.conditional_draws import update_means_and_log_prob_wages
+from respy.config import MAX_LOG_FLOAT
+from respy.likelihood import _simulate_log_probability_of_individuals_observed_choice
+from respy.likelihood import compute_log_likelihoods_of_individuals
 from respy.likelihood import get_crit_func
 from respy.simulate import get_simulate_func
 from respy.tests.utils import process_model_or_seed
@@ -42,3 +49,204 @@ def test_return_scalar_for_likelihood(model):
     array = loglike(params)
 
     assert isinstance(array, np.ndarray)
+
+
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_batch_likelihood_equals_single_evaluations(model):
+    params, options = process_model_or_seed(model)
+
+    simulate = get_simulate_func(params, options)
+    df = simulate(params)
+
+    params_batch = pd.concat([params["value"]] * 3, axis="columns", keys=range(3))
+    params_batch.loc[("delta", "delta"), 1] -= 0.05
+    is_wage_parameter = params.index.get_level_values("category").str.startswith(
+        "wage_"
+    )
+    first_wage_parameter = params.index[is_wage_parameter][0]
+    params_batch.loc[first_wage_parameter, 2] += 0.1
+
+    loglike = get_crit_func(params, options, df, return_scalar=False)
+    expected = np.vstack([loglike(params_batch[i]) for i in range(3)])
+
+    loglike_batch = get_crit_func(params, options, df, return_scalar=False, batch=True)
+    contribs = loglike_batch(params_batch)
+
+    assert contribs.shape == (3, df.index.get_level_values("Identifier").nunique())
+    np.testing.assert_array_equal(contribs, expected)
+
+    loglike_batch = get_crit_func(params, options, df, batch=True)
+    np.testing.assert_array_equal(loglike_batch(params_batch), expected.mean(axis=1))
+
+
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_likelihood_in_chunks_with_memory_mapped_draws(model, tmp_path):
+    params, options = process_model_or_seed(model)
+
+    simulate = get_simulate_func(params, options)
+    df = simulate(params)
+
+    loglike = get_crit_func(params, options, df, return_scalar=False)
+    expected = loglike(params)
+
+    options["estimation_chunk_size"] = 333
+    options["cache_directory"] = tmp_path
+    loglike = get_crit_func(params, options, df, return_scalar=False)
+    result = loglike(params)
+
+    assert isinstance(loglike.keywords["base_draws_est"], np.memmap)
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_single_precision_likelihood_is_close_to_double_precision(model):
+    params, options = process_model_or_seed(model)
+
+    simulate = get_simulate_func(params, options)
+    df = simulate(params)
+
+    loglike = get_crit_func(params, options, df, return_scalar=False)
+    expected = loglike(params)
+
+    options["precision"] = "float32"
+    loglike = get_crit_func(params, options, df, return_scalar=False)
+    result = loglike(params)
+
+    np.testing.assert_allclose(result, expected, rtol=1e-4)
+
+
+@pytest.mark.parametrize("model", ["kw_97_basic", "kw_2000"])
+def test_estimation_data_covers_each_observation_and_type_once(model):
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 5
+
+    simulate = get_simulate_func(params, options)
+    df = simulate(params)
+
+    loglike = get_crit_func(params, options, df)
+    estimation_data = loglike.keywords["estimation_data"]
+    observations = estimation_data["observations"]
+
+    n_types = max(group["type"] for group in observations.values()) + 1
+    counts = np.zeros((estimation_data["n_observations"], n_types))
+    for group in observations.values():
+        counts[group["rows"], group["type"]] += 1
+        np.testing.assert_array_equal(
+            group["draw_indices"], group["rows"] * n_types + group["type"]
+        )
+
+    assert (counts == 1).all()
+
+
+@pytest.mark.parametrize("n_types", [1, 3])
+def test_log_likelihoods_of_individuals_against_pandas(seed, n_types):
+    np.random.seed(seed)
+    identifiers = np.repeat(np.arange(20), np.random.randint(1, 6, size=20))
+    n_obs = identifiers.shape[0]
+
+    loglikes = {
+        "choice": np.log(np.random.uniform(size=(n_obs, n_types))),
+        "wage": np.random.normal(size=(n_obs, n_types)),
+    }
+    log_type_probabilities = np.log(np.random.dirichlet(np.ones(n_types), size=20))
+
+    per_individual_loglikes = (
+        pd.DataFrame(loglikes["choice"] + loglikes["wage"], index=identifiers)
+        .groupby(level=0)
+        .sum()
+        .to_numpy()
+    )
+    weighted_loglikes = per_individual_loglikes + log_type_probabilities
+    expected = special.logsumexp(weighted_loglikes, axis=1)
+    expected_posterior = np.exp(weighted_loglikes - expected.reshape(-1, 1))
+
+    first_observations = np.flatnonzero(np.diff(identifiers, prepend=-1))
+    contribs, posterior = compute_log_likelihoods_of_individuals(
+        loglikes,
+        first_observations,
+        log_type_probabilities,
+        return_posterior_type_probabilities=True,
+    )
+
+    np.testing.assert_allclose(contribs, expected)
+    np.testing.assert_allclose(posterior, expected_posterior)
+    np.testing.assert_allclose(posterior.sum(axis=1), 1)
+
+
+@pytest.mark.parametrize("has_meas_error", [False, True])
+def test_fused_choice_probabilities_against_materialized_draws(seed, has_meas_error):
+    np.random.seed(seed)
+    n_obs, n_draws, n_choices, n_wages = 30, 50, 4, 2
+    tau, delta = 500, 0.95
+
+    shocks_cholesky = np.linalg.cholesky(
+        np.cov(np.random.normal(size=(n_choices, 3 * n_choices)))
+    )
+    meas_sds = np.random.uniform(0.1, 0.5, size=n_wages) * has_meas_error
+    choices = np.random.choice(n_choices, size=n_obs)
+    wages = np.random.lognormal(size=(n_obs, n_choices))
+    log_wages_observed = np.where(
+        choices < n_wages, np.log(wages[np.arange(n_obs), choices]) + 0.1, np.nan
+    )
+    nonpecs = np.random.normal(size=(n_obs, n_choices))
+    continuation_values = np.random.normal(size=(n_obs, n_choices))
+    base_draws = np.random.normal(size=(n_obs, n_draws, n_choices))
+
+    draws, expected_wage_loglikes = create_draws_and_log_prob_wages(
+        log_wages_observed,
+        wages,
+        base_draws,
+        choices,
+        shocks_cholesky,
+        n_wages,
+        meas_sds,
+        has_meas_error,
+    )
+    value_functions = (
+        wages[:, None] * draws + nonpecs[:, None] + delta * continuation_values[:, None]
+    ) / tau
+    log_probabilities = value_functions[
+        np.arange(n_obs), :, choices
+    ] - special.logsumexp(value_functions, axis=2)
+    expected = special.logsumexp(log_probabilities, axis=1) - np.log(n_draws)
+
+    updated_means, wage_loglikes, chol_indices = update_means_and_log_prob_wages(
+        log_wages_observed, wages, choices, shocks_cholesky, n_wages, meas_sds
+    )
+    updated_chols = update_cholesky_factors(
+        shocks_cholesky, n_wages, meas_sds, has_meas_error
+    )
+    result = _simulate_log_probability_of_individuals_observed_choice(
+        base_draws,
+        np.arange(n_obs),
+        updated_means,
+        updated_chols,
+        chol_indices,
+        MAX_LOG_FLOAT,
+        wages,
+        nonpecs,
+        continuation_values,
+        delta,
+        choices,
+        tau,
+    )
+
+    np.testing.assert_array_equal(wage_loglikes, expected_wage_loglikes)
+    np.testing.assert_allclose(result, expected)
+
+
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_serial_and_parallel_likelihood_are_equal(model):
+    params, options = process_model_or_seed(model)
+
+    simulate = get_simulate_func(params, options)
+    df = simulate(params)
+
+    loglike = get_crit_func(params, options, df, return_scalar=False)
+    expected = loglike(params)
+
+    options["estimation_target"] = "serial"
+    loglike = get_crit_func(params, options, df, return_scalar=False)
+    result = loglike(params)
+
+    np.testing.assert_array_equal(result, expected)
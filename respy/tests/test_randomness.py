@@ -3,6 +3,8 @@ import numpy as np
 import pytest
 
 from respy.likelihood import get_crit_func
+from respy.shared import _get_base_draws
+from respy.shared import create_base_draws
 from respy.simulate import get_simulate_func
 from respy.solve import get_solve_func
 from respy.tests.utils import apply_to_attributes_of_two_state_spaces
@@ -49,3 +51,21 @@ def test_invariance_of_model_solution_in_solve_and_criterion_functions(model):
             state_space_.get_attribute("base_draws_sol"),
             np.testing.assert_array_equal,
         )
+
+
+@pytest.mark.parametrize("monte_carlo_sequence", ["random", "halton", "sobol"])
+def test_cached_base_draws_are_equal_to_new_draws(monte_carlo_sequence, tmp_path):
+    shape = (3, 50, 4)
+    draws = create_base_draws(shape, 1, monte_carlo_sequence)
+    assert create_base_draws(shape, 1, monte_carlo_sequence) is draws
+
+    draws_ = create_base_draws(shape, 1, monte_carlo_sequence, tmp_path)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    # Clear the cache in memory to load the draws from disk.
+    _get_base_draws.cache_clear()
+    draws__ = create_base_draws(shape, 1, monte_carlo_sequence, tmp_path)
+
+    assert isinstance(draws__, np.memmap)
+    np.testing.assert_array_equal(draws, draws_)
+    np.testing.assert_array_equal(draws, draws__)
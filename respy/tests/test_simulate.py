@@ -5,10 +5,16 @@ import pytest
 
 import respy as rp
 from respy.config import EXAMPLE_MODELS
+from respy.config import INDEXER_INVALID_INDEX
 from respy.likelihood import get_crit_func
 from respy.pre_processing.data_checking import check_simulated_data
 from respy.pre_processing.model_processing import process_params_and_options
 from respy.pre_processing.specification_helpers import generate_obs_labels
+from respy.shared import create_core_state_space_columns
+from respy.simulate import _apply_law_of_motion
+from respy.simulate import _flatten_indexer
+from respy.simulate import _get_state_index
+from respy.state_space import create_state_space_class
 from respy.tests.random_model import generate_random_model
 from respy.tests.utils import process_model_or_seed
 
@@ -37,6 +43,40 @@ def test_one_step_ahead_simulation():
     df = simulate(params)
 
 
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_simulation_in_chunks(model):
+    params, options = process_model_or_seed(model)
+    options["simulation_agents"] = 100
+
+    simulate = rp.get_simulate_func(params, options)
+    df = simulate(params)
+    columns = ["Choice", "Wage", df.filter(like="Flow_Utility").columns[-1]]
+
+    simulate = rp.get_simulate_func(params, options, chunk_size=30, columns=columns)
+    chunks = list(simulate(params))
+
+    assert len(chunks) == 4
+    assert all(chunk.columns.tolist() == columns for chunk in chunks)
+    for column in columns:
+        np.testing.assert_array_equal(
+            pd.concat(chunk[column] for chunk in chunks), df[column]
+        )
+
+
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_simulated_data_does_not_depend_on_n_jobs(model):
+    params, options = process_model_or_seed(model)
+    options["simulation_agents"] = 101
+
+    simulate = rp.get_simulate_func(params, options)
+    df = simulate(params)
+
+    simulate = rp.get_simulate_func(params, options, n_jobs=3)
+    df_ = simulate(params)
+
+    pd.testing.assert_frame_equal(df, df_)
+
+
 def test_equality_for_myopic_agents_and_tiny_delta():
     """Test equality of simulated data and likelihood with myopia and tiny delta."""
     # Get simulated data and likelihood for myopic model.
@@ -135,3 +175,45 @@ def test_distribution_of_observables():
         ]
 
         np.testing.assert_allclose(probability, params_probability, atol=0.05)
+
+
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_law_of_motion_leads_to_child_states(model):
+    """Test that the law of motion leads to the child states of the state space."""
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 10
+    optim_paras, options = process_params_and_options(params, options)
+    state_space = create_state_space_class(optim_paras, options)
+
+    flat_indexer, indexer_offsets, indexer_shapes = _flatten_indexer(
+        state_space.indexer
+    )
+    core_columns = create_core_state_space_columns(optim_paras)
+    states = state_space.core[core_columns].to_numpy(dtype=np.int64)
+    periods = state_space.core["period"].to_numpy(dtype=np.int64)
+    n_choices_w_exp = len(optim_paras["choices_w_exp"])
+    next_state = np.empty_like(states[0])
+
+    for index, (state, period) in enumerate(zip(states, periods)):
+        assert (
+            _get_state_index(
+                state, period, flat_indexer, indexer_offsets, indexer_shapes
+            )
+            == index
+        )
+
+        for choice, child_index in enumerate(
+            state_space.indices_of_child_states[index]
+        ):
+            if child_index != INDEXER_INVALID_INDEX:
+                _apply_law_of_motion(state, choice, next_state, n_choices_w_exp)
+                assert (
+                    _get_state_index(
+                        next_state,
+                        period + 1,
+                        flat_indexer,
+                        indexer_offsets,
+                        indexer_shapes,
+                    )
+                    == child_index
+                )
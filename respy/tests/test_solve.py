@@ -1,7 +1,13 @@
+import gc
+import pickle
+
 import numpy as np
 import pandas as pd
 import pytest
+from scipy import optimize
+from scipy import special
 
+import respy.solve
 from respy.config import EXAMPLE_MODELS
 from respy.config import INDEXER_INVALID_INDEX
 from respy.config import KEANE_WOLPIN_1994_MODELS
@@ -9,10 +15,14 @@ from respy.config import KEANE_WOLPIN_1997_MODELS
 from respy.interface import get_example_model
 from respy.pre_processing.model_checking import check_model_solution
 from respy.pre_processing.model_processing import process_params_and_options
+from respy.shared import _calculate_worst_case_expected_value
+from respy.shared import calculate_expected_value_functions
+from respy.shared import compute_covariates
 from respy.shared import create_core_state_space_columns
 from respy.solve import get_solve_func
 from respy.state_space import _create_core_and_indexer
 from respy.state_space import _insert_indices_of_child_states
+from respy.state_space import create_state_space_class
 from respy.tests._former_code import _create_state_space_kw94
 from respy.tests._former_code import _create_state_space_kw97_base
 from respy.tests._former_code import _create_state_space_kw97_extended
@@ -234,3 +244,315 @@ def test_explicitly_nonpec_choice_rewards_of_kw_94_two():
         state_space.nonpecs[:, 2], [5_000, 0, -10_000, -15_000, -400_000, -415_000]
     ).all()
     assert (state_space.nonpecs[:, 3] == 14_500).all()
+
+
+def test_worst_case_expected_value_against_dual_problem(seed):
+    """Compare the worst-case expectation with the solution of the dual problem.
+
+    Unless the ambiguity set contains the point mass on the minimum, the worst-case
+    expectation is the maximum of ``-lambda * log(mean(exp(-values / lambda))) - lambda *
+    eta`` over ``lambda > 0``.
+
+    """
+    np.random.seed(seed)
+    values = np.random.normal(1_000, 100, size=100)
+    eta = np.random.choice([0.01, 0.1, 1, 10])
+
+    def negative_dual(log_lambda):
+        lambda_ = np.exp(log_lambda)
+        return lambda_ * (special.logsumexp(-values / lambda_) - np.log(100) + eta)
+
+    result = optimize.minimize_scalar(negative_dual, bounds=(-10, 20), method="bounded")
+    expected = max(-result.fun, values.min())
+
+    worst_case, _ = _calculate_worst_case_expected_value(values, eta, 0, 100, 1e-12)
+
+    assert values.min() <= worst_case <= values.mean()
+    np.testing.assert_allclose(worst_case, expected, rtol=1e-6)
+
+
+def test_warm_start_of_worst_case_expected_value(seed):
+    """Test that warm starts from neighbouring values yield the same result."""
+    np.random.seed(seed)
+    values = np.random.normal(1_000, 100, size=200)
+    neighbouring_values = values + np.random.normal(0, 1, size=200)
+    eta = np.random.uniform(0.01, 1)
+
+    _, multiplier = _calculate_worst_case_expected_value(
+        neighbouring_values, eta, 0, 100, 1e-12
+    )
+    worst_case_warm, _ = _calculate_worst_case_expected_value(
+        values, eta, multiplier, 100, 1e-12
+    )
+    worst_case_cold, _ = _calculate_worst_case_expected_value(
+        values, eta, 0, 100, 1e-12
+    )
+
+    np.testing.assert_allclose(worst_case_warm, worst_case_cold, rtol=1e-10)
+
+
+@pytest.mark.parametrize("n_states, n_draws", [(50, 30), (37, 150)])
+def test_expected_value_functions_without_ambiguity_are_plain_means(
+    seed, n_states, n_draws
+):
+    np.random.seed(seed)
+    n_choices = 4
+
+    wages = np.random.lognormal(size=(n_states, n_choices))
+    nonpecs = np.random.normal(size=(n_states, n_choices))
+    continuation_values = np.random.normal(size=(n_states, n_choices))
+    draws = np.random.normal(size=(n_draws, n_choices))
+
+    value_functions = (
+        wages[:, None, :] * draws[None] + nonpecs[:, None, :]
+    ) + 0.95 * continuation_values[:, None, :]
+    expected = np.clip(value_functions.max(axis=2), 0, None).mean(axis=1)
+
+    result = calculate_expected_value_functions(
+        wages, nonpecs, continuation_values, draws, 0.95, 0
+    )
+    np.testing.assert_allclose(result, expected)
+
+    result_w_ambiguity = calculate_expected_value_functions(
+        wages, nonpecs, continuation_values, draws, 0.95, 0.1
+    )
+    assert (result_w_ambiguity <= result + 1e-12).all()
+
+
+@pytest.mark.parametrize("eta", [0, 0.1])
+def test_expected_value_functions_of_selected_states_equal_subset(seed, eta):
+    np.random.seed(seed)
+    n_states, n_draws, n_choices = 60, 40, 4
+
+    wages = np.random.lognormal(size=(n_states, n_choices))
+    nonpecs = np.random.normal(size=(n_states, n_choices))
+    continuation_values = np.random.normal(size=(n_states, n_choices))
+    draws = np.random.normal(size=(n_draws, n_choices))
+    state_indices = np.flatnonzero(np.random.choice(2, size=n_states))
+
+    expected = calculate_expected_value_functions(
+        wages[state_indices],
+        nonpecs[state_indices],
+        continuation_values[state_indices],
+        draws,
+        0.95,
+        eta,
+    )
+    result = calculate_expected_value_functions(
+        wages,
+        nonpecs,
+        continuation_values,
+        draws,
+        0.95,
+        eta,
+        state_indices=state_indices,
+    )
+
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("model", ["kw_94_one", "kw_97_basic"])
+def test_solution_with_ambiguity(model):
+    params, options = process_model_or_seed(model)
+
+    solve = get_solve_func(params, options)
+    state_space = solve(params)
+    expected_value_functions = state_space.get_attribute("expected_value_functions")
+
+    params.loc[("eta", "eta"), "value"] = 0.1
+
+    solve = get_solve_func(params, options)
+    state_space_w_ambiguity = solve(params)
+
+    optim_paras, options = process_params_and_options(params, options)
+    check_model_solution(optim_paras, options, state_space_w_ambiguity)
+
+    apply_to_attributes_of_two_state_spaces(
+        state_space_w_ambiguity.get_attribute("expected_value_functions"),
+        expected_value_functions,
+        lambda x, y: np.testing.assert_array_less(x, y + 1e-6),
+    )
+
+
+@pytest.mark.parametrize(
+    "model, interpolation_points",
+    [("kw_97_basic", -1), ("kw_97_basic", 500), ("kw_2000", -1)],
+)
+def test_invariance_of_solution_to_number_of_jobs(model, interpolation_points):
+    """Solving the dense sub state spaces concurrently does not change the solution."""
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 10
+    options["interpolation_points"] = interpolation_points
+
+    solve = get_solve_func(params, options)
+    state_space = solve(params)
+
+    options["n_jobs"] = 2
+    solve = get_solve_func(params, options)
+    state_space_ = solve(params)
+
+    for attribute in ["wages", "nonpecs", "expected_value_functions"]:
+        apply_to_attributes_of_two_state_spaces(
+            state_space.get_attribute(attribute),
+            state_space_.get_attribute(attribute),
+            np.testing.assert_array_equal,
+        )
+
+
+def test_memory_mapped_state_space_is_shared_after_pickling(tmp_path):
+    params, options = process_model_or_seed("kw_97_basic")
+    options["n_periods"] = 5
+
+    solve = get_solve_func(params, options)
+    state_space = solve(params)
+
+    options["memory_map_directory"] = tmp_path
+    solve = get_solve_func(params, options)
+    state_space_ = solve(params)
+
+    for attribute in ["wages", "nonpecs", "expected_value_functions"]:
+        apply_to_attributes_of_two_state_spaces(
+            state_space.get_attribute(attribute),
+            state_space_.get_attribute(attribute),
+            np.testing.assert_array_equal,
+        )
+
+    # Pickling only stores the locations of the files.
+    assert len(pickle.dumps(state_space_)) < len(pickle.dumps(state_space)) / 10
+
+    # The unpickled state space works on the same memory.
+    unpickled_state_space = pickle.loads(pickle.dumps(state_space_))
+    unpickled_state_space.set_attribute(
+        "expected_value_functions",
+        {
+            key: np.zeros_like(value)
+            for key, value in state_space_.get_attribute(
+                "expected_value_functions"
+            ).items()
+        },
+    )
+    for value in state_space_.get_attribute("expected_value_functions").values():
+        assert (value == 0).all()
+
+    # The temporary files are removed with the state space of the creating process.
+    del solve, state_space_
+    gc.collect()
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("model", ["kw_97_basic", "kw_2000"])
+def test_columnar_state_space_against_data_frame(model):
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 5
+
+    optim_paras, options = process_params_and_options(params, options)
+    state_space = create_state_space_class(optim_paras, options)
+
+    core = state_space.core
+    for period in range(options["n_periods"]):
+        expected = core.query("period == @period").index
+        slice_ = state_space.slices_by_periods[period]
+        np.testing.assert_array_equal(np.arange(slice_.start, slice_.stop), expected)
+        assert state_space.get_n_states_in_period(period) == len(expected)
+
+    for sub_state_space in state_space.sub_state_spaces.values():
+        states = core.assign(**sub_state_space.dense_covariates)
+        states = compute_covariates(states, options["covariates_mixed"])
+        pd.testing.assert_frame_equal(sub_state_space.states, states, check_dtype=False)
+
+        for name, design_matrix in sub_state_space.design_matrices.items():
+            columns = optim_paras[name].index
+            np.testing.assert_array_equal(design_matrix, states[columns].to_numpy())
+
+
+def test_solution_is_reused_if_parameters_of_solution_do_not_change(monkeypatch):
+    params, options = process_model_or_seed("kw_2000")
+    options["n_periods"] = 5
+
+    n_calls = []
+    solve_with_backward_induction = respy.solve._solve_with_backward_induction
+
+    def counting_solve_with_backward_induction(*args, **kwargs):
+        n_calls.append(1)
+        return solve_with_backward_induction(*args, **kwargs)
+
+    monkeypatch.setattr(
+        respy.solve,
+        "_solve_with_backward_induction",
+        counting_solve_with_backward_induction,
+    )
+
+    solve = get_solve_func(params, options)
+    solve(params)
+    assert len(n_calls) == 1
+
+    # Measurement errors and type probabilities do not affect the solution.
+    params.loc["meas_error", "value"] += 0.01
+    params.loc[params.index.get_level_values(0).str.startswith("type_"), "value"] += 0.1
+    solve(params)
+    assert len(n_calls) == 1
+
+    params.loc[("wage_white_collar", "constant"), "value"] += 0.01
+    state_space = solve(params)
+    assert len(n_calls) == 2
+
+    state_space_ = get_solve_func(params, options)(params)
+    apply_to_attributes_of_two_state_spaces(
+        state_space.get_attribute("expected_value_functions"),
+        state_space_.get_attribute("expected_value_functions"),
+        np.testing.assert_array_equal,
+    )
+
+
+@pytest.mark.parametrize(
+    "model, interpolation_points",
+    [("kw_94_one", -1), ("kw_97_basic", 500), ("kw_2000", -1)],
+)
+def test_partial_resolve_equals_full_solution(model, interpolation_points):
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 6
+    options["interpolation_points"] = interpolation_points
+    options["partial_resolve"] = True
+
+    solve = get_solve_func(params, options)
+    solve(params)
+
+    reward_parameters = params.index[
+        params.index.get_level_values(0).str.startswith(("wage_", "nonpec_"))
+    ]
+    for index in np.random.choice(len(reward_parameters), size=3, replace=False):
+        params.loc[reward_parameters[index], "value"] += 0.01
+        state_space = solve(params)
+
+        state_space_ = get_solve_func(params, {**options, "partial_resolve": False})(
+            params
+        )
+        for attribute in ["wages", "nonpecs", "expected_value_functions"]:
+            apply_to_attributes_of_two_state_spaces(
+                state_space.get_attribute(attribute),
+                state_space_.get_attribute(attribute),
+                np.testing.assert_array_equal,
+            )
+
+
+@pytest.mark.parametrize(
+    "model, interpolation_points",
+    [("kw_94_one", -1), ("kw_97_basic", 500), ("kw_2000", -1)],
+)
+def test_single_precision_solution_is_close_to_double_precision(
+    model, interpolation_points
+):
+    params, options = process_model_or_seed(model)
+    options["n_periods"] = 10
+    options["interpolation_points"] = interpolation_points
+
+    state_space = get_solve_func(params, options)(params)
+
+    options["precision"] = "float32"
+    state_space_ = get_solve_func(params, options)(params)
+
+    apply_to_attributes_of_two_state_spaces(
+        state_space.get_attribute("expected_value_functions"),
+        state_space_.get_attribute("expected_value_functions"),
+        lambda x, y: np.testing.assert_allclose(x, y, rtol=1e-4),
+    )